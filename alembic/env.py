@@ -0,0 +1,54 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+
+from models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+# Full-text search objects are created by hand, see alembic/versions/0004_task_search.py
+SEARCH_OBJECTS = ("tasks_search", "ix_tasks_search", "search_vector")
+
+def include_name(name, type_, parent_names):
+    return not (name or "").startswith(SEARCH_OBJECTS)
+
+def do_run_migrations(connection):
+    # Batch mode lets ALTERs work on SQLite by rebuilding the table
+    context.configure(
+        connection=connection, target_metadata=target_metadata, render_as_batch=True, include_name=include_name
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_async_migrations():
+    from database import engine
+
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+def run_migrations_offline():
+    from database import _url
+
+    context.configure(
+        url=_url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_name=include_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+# migrations.upgrade passes the app's own connection; the alembic CLI does not
+connection = config.attributes.get("connection")
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    do_run_migrations(connection)
+else:
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    asyncio.run(run_async_migrations())
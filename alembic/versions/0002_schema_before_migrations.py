@@ -0,0 +1,214 @@
+"""Schema added by releases before migrations existed
+
+Those releases ran create_all at startup, which creates missing tables but
+never adds columns or indexes to tables that already exist. A database
+created by one of them therefore has any mix of the objects below, so each
+is only created when missing:
+
+- tables: ``daily_user_stats``, ``task_tags``, ``background_jobs``,
+  ``insight_watermarks`` and ``resource_versions``;
+- the ``tasks.completed_at`` column;
+- indexes, removing duplicate rows (keeping the newest) before a unique
+  one is built.
+
+Tags that still live in the legacy JSON ``tasks.tags`` column are copied
+into ``task_tags`` and the column is dropped. A ``daily_user_stats`` table
+created here starts empty; run ``python rollups.py`` to fill it from the
+existing history.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 19:45:00.000000
+
+"""
+from typing import Sequence, Union
+import json
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 1000
+
+
+def create_daily_user_stats():
+    op.create_table('daily_user_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('focus_minutes', sa.Integer(), nullable=False),
+    sa.Column('completed_sessions', sa.Integer(), nullable=False),
+    sa.Column('completed_tasks', sa.Integer(), nullable=False),
+    sa.Column('commits', sa.Integer(), nullable=False),
+    sa.Column('streak', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', name='uq_daily_user_stats_user_day')
+    )
+    op.create_index('ix_daily_user_stats_id', 'daily_user_stats', ['id'], unique=False)
+
+
+def create_task_tags():
+    op.create_table('task_tags',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('task_id', 'name')
+    )
+
+
+def create_background_jobs():
+    op.create_table('background_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def create_insight_watermarks():
+    op.create_table('insight_watermarks',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_session_id', sa.Integer(), nullable=True),
+    sa.Column('last_session_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def create_resource_versions():
+    op.create_table('resource_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+
+# In the order the releases added them
+TABLES = (
+    ('daily_user_stats', create_daily_user_stats),
+    ('task_tags', create_task_tags),
+    ('background_jobs', create_background_jobs),
+    ('insight_watermarks', create_insight_watermarks),
+    ('resource_versions', create_resource_versions),
+)
+
+# (name, table, columns, unique)
+INDEXES = (
+    ('ix_tasks_user_created', 'tasks', ['user_id', 'created_at', 'id'], False),
+    ('ix_tasks_user_completed_created', 'tasks', ['user_id', 'completed', 'created_at', 'id'], False),
+    ('ix_tasks_user_deadline', 'tasks', ['user_id', 'deadline'], False),
+    ('ix_task_tags_user_name', 'task_tags', ['user_id', 'name', 'task_id'], False),
+    ('ix_pomodoro_sessions_user_started', 'pomodoro_sessions', ['user_id', 'started_at'], False),
+    ('uq_github_stats_user_date', 'github_stats', ['user_id', 'date'], True),
+    ('uq_ai_insights_user_type', 'ai_insights', ['user_id', 'type'], True),
+    ('ix_daily_user_stats_user_updated', 'daily_user_stats', ['user_id', 'updated_at'], False),
+    ('ix_background_jobs_user_kind_status', 'background_jobs', ['user_id', 'kind', 'status'], False),
+)
+
+
+def normalize_tags(names):
+    seen = []
+    for name in names:
+        name = name.strip()
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def create_missing_tables(connection):
+    existing = set(sa.inspect(connection).get_table_names())
+    for name, create in TABLES:
+        if name in existing:
+            continue
+        create()
+        if name == 'daily_user_stats' and connection.execute(sa.text('SELECT 1 FROM users LIMIT 1')).first():
+            logger.warning('daily_user_stats was created empty; run `python rollups.py` to fill it from history')
+
+
+def task_columns(connection):
+    return {column['name'] for column in sa.inspect(connection).get_columns('tasks')}
+
+
+def create_missing_indexes(connection):
+    inspector = sa.inspect(connection)
+    for name, table, columns, unique in INDEXES:
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            continue
+        if unique:
+            keys = ', '.join(columns)
+            op.execute(
+                f'DELETE FROM {table} WHERE id NOT IN '
+                f'(SELECT MAX(id) FROM {table} GROUP BY {keys})'
+            )
+        op.create_index(name, table, columns, unique=unique)
+
+
+def copy_legacy_tags(connection):
+    rows = connection.execute(sa.text(
+        'SELECT id, user_id, tags FROM tasks WHERE tags IS NOT NULL '
+        'AND id NOT IN (SELECT task_id FROM task_tags)'
+    )).all()
+
+    links = []
+    for task_id, user_id, raw in rows:
+        try:
+            names = json.loads(raw) if raw else []
+        except ValueError:
+            names = []
+        if not isinstance(names, list):
+            names = []
+        for position, name in enumerate(normalize_tags(str(name) for name in names)):
+            links.append({'task_id': task_id, 'user_id': user_id, 'name': name, 'position': position})
+
+    task_tags = sa.table(
+        'task_tags', sa.column('task_id'), sa.column('user_id'), sa.column('name'), sa.column('position')
+    )
+    for start in range(0, len(links), BATCH_SIZE):
+        op.bulk_insert(task_tags, links[start:start + BATCH_SIZE])
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('tags')
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    create_missing_tables(connection)
+    if 'completed_at' not in task_columns(connection):
+        op.add_column('tasks', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+    create_missing_indexes(connection)
+    if 'tags' in task_columns(connection):
+        copy_legacy_tags(connection)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for name, _ in reversed(TABLES):
+        op.drop_table(name)
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('completed_at')
+        batch_op.add_column(sa.Column('tags', sa.Text(), nullable=True))
@@ -0,0 +1,41 @@
+"""Monthly summaries of compacted Pomodoro sessions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('pomodoro_monthly_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('work_sessions', sa.Integer(), nullable=False),
+    sa.Column('completed_work_sessions', sa.Integer(), nullable=False),
+    sa.Column('work_by_hour', sa.Text(), nullable=False),
+    sa.Column('focus_by_day', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'month', name='uq_pomodoro_monthly_summaries_user_month')
+    )
+    op.create_index('ix_pomodoro_monthly_summaries_id', 'pomodoro_monthly_summaries', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pomodoro_monthly_summaries_id', table_name='pomodoro_monthly_summaries')
+    op.drop_table('pomodoro_monthly_summaries')
@@ -0,0 +1,77 @@
+"""Full-text search index over tasks
+
+PostgreSQL gets a generated ``tasks.search_vector`` column (the weighted
+title and description, stored so ranking does not recompute it) with a GIN
+index. SQLite gets the ``tasks_search`` FTS5 table over
+``tasks`` (external content, so the text is not stored twice) and triggers
+that keep it in sync, then indexes the existing rows. Neither is part of
+the models; alembic/env.py leaves them out of autogenerate.
+
+A later batch migration that rebuilds ``tasks`` on SQLite drops the
+triggers with the old table and has to recreate them.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TASK_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE tasks_search USING fts5("
+    "title, description, user_id, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER tasks_search_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_search(rowid, title, description, user_id) VALUES (new.id, new.title, new.description, new.user_id); "
+    "END",
+    "CREATE TRIGGER tasks_search_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_search(tasks_search, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.user_id); "
+    "END",
+    "CREATE TRIGGER tasks_search_update AFTER UPDATE OF title, description, user_id ON tasks BEGIN "
+    "INSERT INTO tasks_search(tasks_search, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.user_id); "
+    "INSERT INTO tasks_search(rowid, title, description, user_id) VALUES (new.id, new.title, new.description, new.user_id); "
+    "END",
+    "INSERT INTO tasks_search(tasks_search) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS tasks_search_update",
+    "DROP TRIGGER IF EXISTS tasks_search_delete",
+    "DROP TRIGGER IF EXISTS tasks_search_insert",
+    "DROP TABLE IF EXISTS tasks_search",
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(f'ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({TASK_SEARCH_VECTOR}) STORED')
+        op.execute('CREATE INDEX ix_tasks_search ON tasks USING gin (search_vector)')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_tasks_search')
+        op.execute('ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,29 @@
+"""Client idempotency key on Pomodoro sessions
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('pomodoro_sessions', sa.Column('client_ref', sa.String(length=64), nullable=True))
+    op.create_index('uq_pomodoro_sessions_client_ref', 'pomodoro_sessions', ['client_ref'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_pomodoro_sessions_client_ref', table_name='pomodoro_sessions')
+    with op.batch_alter_table('pomodoro_sessions') as batch_op:
+        batch_op.drop_column('client_ref')
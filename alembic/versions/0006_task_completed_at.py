@@ -0,0 +1,35 @@
+"""Add tasks.completed_at to databases that predate it
+
+0002 adds the column to databases it migrates now, but earlier releases
+of 0002 did not, and databases already past it when it changed still lack
+the column. This adds it there and does nothing anywhere else. Completed
+tasks keep a NULL completion time; the rollup falls back to
+``updated_at`` for those.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('tasks')}
+    if 'completed_at' not in columns:
+        op.add_column('tasks', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    # The column belongs to 0002, whose downgrade drops it
+    pass
@@ -0,0 +1,35 @@
+"""Scope Pomodoro session client_ref to its user
+
+A globally unique key let one user's ``client_ref`` collide with another's,
+and a queued create that collided was dropped after it was acknowledged.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('uq_pomodoro_sessions_client_ref', table_name='pomodoro_sessions')
+    op.create_index('uq_pomodoro_sessions_user_client_ref', 'pomodoro_sessions', ['user_id', 'client_ref'], unique=True)
+
+
+def downgrade() -> None:
+    # Keys shared across users cannot stay unique globally; keep the oldest
+    op.execute(
+        'UPDATE pomodoro_sessions SET client_ref = NULL WHERE client_ref IS NOT NULL AND id NOT IN '
+        '(SELECT MIN(id) FROM pomodoro_sessions WHERE client_ref IS NOT NULL GROUP BY client_ref)'
+    )
+    op.drop_index('uq_pomodoro_sessions_user_client_ref', table_name='pomodoro_sessions')
+    op.create_index('uq_pomodoro_sessions_client_ref', 'pomodoro_sessions', ['client_ref'], unique=True)
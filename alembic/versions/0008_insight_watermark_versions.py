@@ -0,0 +1,42 @@
+"""Key insight watermarks on resource versions
+
+The watermark compared the newest session and rollup timestamps, which
+miss changes made within the same second (SQLite ``CURRENT_TIMESTAMP``)
+and edits to existing sessions. It now records the ``pomodoro`` and
+``github`` resource versions the insights were built from. Existing
+watermarks start empty, so each user's next run regenerates once.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('insight_watermarks') as batch_op:
+        batch_op.drop_column('last_session_id')
+        batch_op.drop_column('last_session_at')
+        batch_op.drop_column('last_activity_at')
+        batch_op.add_column(sa.Column('pomodoro_version', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('github_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('insight_watermarks') as batch_op:
+        batch_op.drop_column('github_version')
+        batch_op.drop_column('pomodoro_version')
+        batch_op.add_column(sa.Column('last_session_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_session_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True))
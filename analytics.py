@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime
+import json
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import GitHubStats, PomodoroMonthlySummary, PomodoroSession
+
+DAY_NAMES = ("Mondays", "Tuesdays", "Wednesdays", "Thursdays", "Fridays", "Saturdays", "Sundays")
+ROLLING_DAYS = 7
+BASELINE_DAYS = 28
+MIN_CORRELATION_DAYS = 14
+
+@dataclass
+class History:
+    """A user's sessions and GitHub activity as columnar arrays.
+
+    Sessions compacted by retention.py only survive as totals, in the
+    ``past_*`` fields; the functions below add them in.
+    """
+    started: np.ndarray  # datetime64[m], ascending
+    duration: np.ndarray  # minutes
+    completed: np.ndarray  # bool
+    is_work: np.ndarray  # bool
+    stat_days: np.ndarray  # datetime64[D]
+    stat_commits: np.ndarray
+    past_sessions: int = 0
+    past_work: int = 0
+    past_completed_work: int = 0
+    past_heatmap: np.ndarray = field(default_factory=lambda: np.zeros((7, 24), dtype=np.int64))
+    past_days: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype="datetime64[D]"))  # ascending
+    past_focus: np.ndarray = field(default_factory=lambda: np.zeros(0))  # completed minutes on past_days
+
+    @property
+    def session_count(self):
+        return len(self.started) + self.past_sessions
+
+def _minutes(value: datetime):
+    # Aware timestamps are stored in UTC; hours are reported as stored
+    return np.datetime64(value.replace(tzinfo=None), "m")
+
+async def load_history(db: AsyncSession, user_id: int):
+    sessions = (await db.execute(select(
+        PomodoroSession.started_at,
+        PomodoroSession.duration,
+        PomodoroSession.completed,
+        PomodoroSession.session_type
+    ).where(
+        PomodoroSession.user_id == user_id,
+        PomodoroSession.started_at.is_not(None)
+    ).order_by(PomodoroSession.started_at))).all()
+
+    stats = (await db.execute(select(GitHubStats.date, GitHubStats.commits).where(
+        GitHubStats.user_id == user_id
+    ).order_by(GitHubStats.date))).all()
+
+    summaries = (await db.scalars(select(PomodoroMonthlySummary).where(
+        PomodoroMonthlySummary.user_id == user_id
+    ).order_by(PomodoroMonthlySummary.month))).all()
+
+    count = len(sessions)
+    history = History(
+        started=np.fromiter((_minutes(row[0]) for row in sessions), dtype="datetime64[m]", count=count),
+        duration=np.fromiter((row[1] or 0 for row in sessions), dtype=np.int64, count=count),
+        completed=np.fromiter((bool(row[2]) for row in sessions), dtype=bool, count=count),
+        is_work=np.fromiter((row[3] != "break" for row in sessions), dtype=bool, count=count),
+        stat_days=np.fromiter((np.datetime64(row[0].date(), "D") for row in stats), dtype="datetime64[D]", count=len(stats)),
+        stat_commits=np.fromiter((row[1] or 0 for row in stats), dtype=np.int64, count=len(stats)),
+    )
+    if summaries:
+        focus = {}
+        for summary in summaries:
+            history.past_sessions += summary.sessions
+            history.past_work += summary.work_sessions
+            history.past_completed_work += summary.completed_work_sessions
+            history.past_heatmap += np.array(json.loads(summary.work_by_hour), dtype=np.int64).reshape(7, 24)
+            for day, (minutes, _) in json.loads(summary.focus_by_day).items():
+                focus[day] = focus.get(day, 0) + minutes
+        days = sorted(focus)
+        history.past_days = np.array(days, dtype="datetime64[D]")
+        history.past_focus = np.array([focus[day] for day in days], dtype=float)
+    return history
+
+def hour_of_week_heatmap(history: History):
+    """Work sessions started per (weekday, hour), Monday first."""
+    started = history.started[history.is_work]
+    minutes = started.astype(np.int64)
+    days = minutes // 1440
+    hours = (minutes // 60) % 24
+    weekdays = (days + 3) % 7  # 1970-01-01 was a Thursday
+    return np.bincount(weekdays * 24 + hours, minlength=168).reshape(7, 24) + history.past_heatmap
+
+def daily_focus(history: History, today: date):
+    """Completed focus minutes per day, from the first session up to ``today``."""
+    days = history.started.astype("datetime64[D]")
+    firsts = [values[0] for values in (days, history.past_days) if len(values)]
+    if not firsts:
+        return np.datetime64(today, "D"), np.zeros(0)
+    first = min(firsts)
+    span = int((np.datetime64(today, "D") - first).astype(np.int64)) + 1
+    mask = history.completed & (days <= np.datetime64(today, "D"))
+    index = (days[mask] - first).astype(np.int64)
+    focus = np.bincount(index, weights=history.duration[mask], minlength=max(span, 0))
+    past = history.past_days <= np.datetime64(today, "D")
+    if past.any():
+        index = (history.past_days[past] - first).astype(np.int64)
+        focus += np.bincount(index, weights=history.past_focus[past], minlength=len(focus))
+    return first, focus
+
+def rolling_mean(values: np.ndarray, window: int):
+    if len(values) < window:
+        return np.zeros(0)
+    cumulative = np.cumsum(np.insert(values.astype(float), 0, 0.0))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def completion_rates(history: History, today: date, recent_days: int = 30):
+    work = history.is_work
+    total = int(work.sum()) + history.past_work
+    if not total:
+        return None
+    overall = (int(history.completed[work].sum()) + history.past_completed_work) / total
+    cutoff = np.datetime64(today, "D") - recent_days
+    recent = work & (history.started.astype("datetime64[D]") > cutoff)
+    recent_rate = history.completed[recent].mean() if recent.any() else None
+    return {"overall": float(overall), "recent": None if recent_rate is None else float(recent_rate), "sessions": total}
+
+def commit_focus_correlation(history: History, first_day, focus: np.ndarray):
+    """Pearson correlation of daily commits and focus minutes on days both are tracked."""
+    if not len(history.stat_days) or not len(focus):
+        return None
+    offsets = (history.stat_days - first_day).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < len(focus))
+    if inside.sum() < MIN_CORRELATION_DAYS:
+        return None
+    commits = history.stat_commits[inside].astype(float)
+    minutes = focus[offsets[inside]]
+    if commits.std() == 0 or minutes.std() == 0:
+        return None
+    return float(np.corrcoef(commits, minutes)[0, 1]), int(inside.sum())
+
+def _confidence(samples: int, floor: int = 60, ceiling: int = 95):
+    # More history, more confidence; saturates around a few hundred samples
+    return int(min(ceiling, floor + (ceiling - floor) * (1 - np.exp(-samples / 100))))
+
+def build_insights(history: History, today: date = None):
+    """Turn a user's history into insight dicts ready to be stored."""
+    today = today or date.today()
+    insights = []
+    if not history.session_count:
+        return insights
+
+    heatmap = hour_of_week_heatmap(history)
+    work_sessions = int(heatmap.sum())
+    if work_sessions:
+        by_hour = heatmap.sum(axis=0)
+        peak_hour = int(by_hour.argmax())
+        percentage = round(by_hour[peak_hour] / work_sessions * 100)
+        peak_day = int(heatmap[:, peak_hour].argmax())
+        insights.append({
+            "type": "peak_hours",
+            "title": "Peak Productivity Hours",
+            "description": (
+                f"You're most productive around {peak_hour}:00 with {percentage}% of your sessions, "
+                f"especially on {DAY_NAMES[peak_day]}."
+            ),
+            "confidence": _confidence(work_sessions),
+        })
+
+    first_day, focus = daily_focus(history, today)
+    rolling = rolling_mean(focus, ROLLING_DAYS)
+    if len(focus) >= ROLLING_DAYS + BASELINE_DAYS:
+        current = rolling[-1]
+        baseline = focus[-(ROLLING_DAYS + BASELINE_DAYS):-ROLLING_DAYS].mean()
+        if baseline > 0:
+            change = (current - baseline) / baseline * 100
+            if change >= 10:
+                title, description = "Focus Trending Up", f"Your focus time is up {change:.0f}% on your previous four weeks ({current:.0f} min/day). Keep it going!"
+            elif change <= -10:
+                title, description = "Focus Slipping", f"Your focus time is down {-change:.0f}% on your previous four weeks ({current:.0f} min/day). Try blocking time for deep work."
+            else:
+                title, description = "Steady Focus", f"You're averaging {current:.0f} focused minutes a day, in line with your previous four weeks."
+            insights.append({
+                "type": "focus_trend",
+                "title": title,
+                "description": description,
+                "confidence": _confidence(len(focus)),
+            })
+    else:
+        recent = history.duration[history.completed][-10:]
+        if len(recent) >= 5:
+            avg_duration = recent.mean()
+            if avg_duration > 20:
+                title, description = "Strong Focus Sessions", f"Your average session length is {avg_duration:.1f} minutes. Excellent focus!"
+            else:
+                title, description = "Consider Longer Sessions", f"Your average session is {avg_duration:.1f} minutes. Try extending to 25-minute sessions."
+            insights.append({
+                "type": "focus_trend",
+                "title": title,
+                "description": description,
+                "confidence": _confidence(len(recent)),
+            })
+
+    rates = completion_rates(history, today)
+    if rates and rates["sessions"] >= 5:
+        rate = rates["recent"] if rates["recent"] is not None else rates["overall"]
+        if rate < 0.6:
+            title, description = "Unfinished Sessions", f"Only {rate:.0%} of your recent sessions ran to completion. Shorter sessions may be easier to finish."
+        else:
+            title, description = "Finishing What You Start", f"You complete {rate:.0%} of your recent sessions."
+        insights.append({
+            "type": "completion_rate",
+            "title": title,
+            "description": description,
+            "confidence": _confidence(rates["sessions"]),
+        })
+
+    correlation = commit_focus_correlation(history, first_day, focus)
+    if correlation is not None:
+        coefficient, days = correlation
+        if coefficient >= 0.3:
+            description = "Days with more focus time tend to bring more commits. Protect your focus blocks."
+        elif coefficient <= -0.3:
+            description = "Your commits tend to land on days with less timed focus. You may be tracking only part of your work."
+        else:
+            description = "Your commit activity and focus time move independently of each other."
+        insights.append({
+            "type": "commit_focus",
+            "title": "Commits vs. Focus",
+            "description": f"{description} (correlation {coefficient:+.2f} over {days} days)",
+            "confidence": _confidence(days),
+        })
+
+    work_done = history.started[history.is_work & history.completed]
+    if len(work_done) >= 3:
+        # Three consecutive work sessions within three hours
+        span = (work_done[-1] - work_done[-3]).astype(np.int64)
+        if span < 180:
+            insights.append({
+                "type": "break_reminder",
+                "title": "Take a Break",
+                "description": "You've had several focused sessions recently. Consider taking a longer break.",
+                "confidence": 85,
+            })
+
+    return insights
@@ -0,0 +1,101 @@
+"""Cold-start time of one app process, from interpreter start to first response.
+
+Each run is a fresh interpreter against an already migrated SQLite file.
+It times importing ``main``, the lifespan startup and a first request
+through an in-process ASGI client. Three modes are compared:
+
+- ``auto-migrate``: ``uvicorn main:app`` in development, which checks
+  migrations on every start;
+- ``worker``: a ``serve.py`` worker, which skips schema work;
+- ``eager-imports``: a worker that also loads NumPy and httpx up front,
+  as every process did before they were imported on first use.
+
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = ("auto-migrate", "worker", "eager-imports")
+
+def child(mode: str):
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    if mode == "eager-imports":
+        import numpy  # noqa: F401
+        import httpx  # noqa: F401
+    import asyncio
+    import main
+    imported = time.perf_counter()
+
+    async def get(path):
+        # Raw ASGI call; an HTTP client would import httpx and skew the comparison
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        await main.app({
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80), "root_path": "",
+        }, receive, send)
+        return messages[0]["status"]
+
+    async def boot():
+        async with main.app.router.lifespan_context(main.app):
+            ready = time.perf_counter()
+            assert await get("/api/health") == 200
+            return ready, time.perf_counter()
+
+    ready, answered = asyncio.run(boot())
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_response_ms": (answered - started) * 1000,
+    }))
+
+def run(mode: str, env: dict):
+    env = dict(env, DB_AUTO_MIGRATE="true" if mode == "auto-migrate" else "false")
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # Includes interpreter start-up, which the in-process timings cannot see
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+def main(runs: int):
+    db_file = os.path.join(tempfile.mkdtemp(), "cold.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_file}")
+    # Migrate once so every timed run starts from an up-to-date schema
+    run("auto-migrate", env)
+
+    fields = ("import_ms", "startup_ms", "first_response_ms", "process_ms")
+    print(f"median of {runs} runs")
+    print(f"{'mode':<16}" + "".join(f"{field[:-3]:>18}" for field in fields))
+    for mode in MODES:
+        results = [run(mode, env) for _ in range(runs)]
+        medians = [statistics.median(result[field] for result in results) for field in fields]
+        print(f"{mode:<16}" + "".join(f"{value:>15.0f} ms" for value in medians))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    else:
+        main(args.runs)
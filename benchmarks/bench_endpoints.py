@@ -0,0 +1,387 @@
+"""Latency, throughput and SQL query counts for every API route.
+
+Boots ``main.app`` in-process (lifespan included) against a fresh SQLite
+file, or ``--database-url``, seeds users with tasks, sessions, GitHub stats
+and insights, then drives each route through an ``httpx`` ASGI client with
+``--concurrency`` requests in flight. Routes run one after another, reads
+before writes. Results are printed and written as JSON; with ``--baseline``
+the run fails when a route's median latency grew by more than
+``--tolerance`` or it runs more queries per request than before.
+
+    python benchmarks/bench_endpoints.py --users 5 --tasks 2000 --requests 200
+    python benchmarks/bench_endpoints.py --baseline benchmarks/baselines/endpoints.json
+
+GitHub syncs run against an empty offline GitHub, and bcrypt runs at the
+lowest cost (see bench_password_hashing.py for that).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "endpoints.json")
+# Latency differences below this are noise, whatever the ratio
+NOISE_FLOOR_MS = 5.0
+# Average extra queries per request tolerated before flagging (cache hits vary)
+QUERY_SLACK = 0.5
+
+# Queries run by the request the current coroutine is sending
+_query_count = contextvars.ContextVar("query_count", default=None)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class Scenario:
+    """One route, called ``--requests`` times.
+
+    ``build(user, i)`` returns the ``httpx`` request arguments for the
+    ``i``-th call on behalf of a seeded user; ``after`` sees each response.
+    ``concurrency`` caps ``--concurrency`` for routes that are rarely busy.
+    """
+
+    def __init__(self, method, path, build=None, expect=200, name=None, after=None, concurrency=None):
+        self.method = method
+        self.path = path
+        self.name = name or f"{method} {path}"
+        self.build = build or (lambda user, i: {"url": path})
+        self.expect = expect
+        self.after = after
+        self.concurrency = concurrency
+
+class SeededUser:
+    def __init__(self, id, username, token):
+        self.id = id
+        self.username = username
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.task_ids = []
+        self.session_ids = []
+        self.created_task_ids = []
+        self.job_ids = []
+        self.etags = {}
+
+async def seed(users, tasks, sessions, days, run_id):
+    from sqlalchemy import insert, select
+    from auth_utils import create_access_token, get_password_hash
+    from database import SessionLocal
+    from models import GitHubStats, PomodoroSession, Task, TaskTag, User
+    from routers.insights import refresh_insights
+    import rollups
+
+    start = datetime.now() - timedelta(days=days)
+    password = get_password_hash("benchmark")
+    seeded = []
+    async with SessionLocal() as db:
+        for n in range(users):
+            username = f"bench-{run_id}-{n}"
+            user = User(email=f"{username}@example.com", username=username, hashed_password=password,
+                        github_username=username)
+            db.add(user)
+            await db.flush()
+            await db.execute(insert(Task), [
+                {"user_id": user.id, "title": f"Task {i}", "description": "Benchmark task",
+                 "priority": ("low", "medium", "high")[i % 3], "completed": i % 3 == 0,
+                 "completed_at": start + timedelta(minutes=i * 7) if i % 3 == 0 else None,
+                 "deadline": start + timedelta(days=i % days + 1), "time_spent": 25,
+                 "created_at": start + timedelta(minutes=i * 7), "updated_at": start + timedelta(minutes=i * 7)}
+                for i in range(tasks)
+            ])
+            task_ids = (await db.scalars(select(Task.id).where(Task.user_id == user.id).order_by(Task.id))).all()
+            await db.execute(insert(TaskTag), [
+                {"task_id": task_id, "user_id": user.id, "name": name, "position": position}
+                for i, task_id in enumerate(task_ids)
+                for position, name in enumerate(("work", f"project-{i % 10}"))
+            ])
+            await db.execute(insert(PomodoroSession), [
+                {"user_id": user.id, "duration": 25, "completed": i % 5 != 0, "session_type": "work",
+                 "task_id": task_ids[i % len(task_ids)] if task_ids else None,
+                 "started_at": start + timedelta(minutes=i * days * 1440 // max(sessions, 1))}
+                for i in range(sessions)
+            ])
+            await db.execute(insert(GitHubStats), [
+                {"user_id": user.id, "date": start + timedelta(days=i), "commits": i % 7, "lines_added": 0,
+                 "lines_removed": 0, "pull_requests": i % 3, "issues": i % 2,
+                 "repositories": json.dumps(["devdash", "api"])}
+                for i in range(days)
+            ])
+            await rollups.rebuild_user_stats(db, user.id)
+            await refresh_insights(db, user.id, force=True)
+            await db.commit()
+
+            seeded_user = SeededUser(user.id, username, create_access_token({"sub": username}, timedelta(hours=2)))
+            seeded_user.task_ids = list(task_ids)
+            seeded_user.session_ids = (await db.scalars(
+                select(PomodoroSession.id).where(PomodoroSession.user_id == user.id)
+            )).all()
+            seeded.append(seeded_user)
+    return seeded
+
+def offline_github():
+    """An ``httpx`` transport standing in for a GitHub account with no repositories."""
+    import httpx
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+
+async def offline_sync(db, job):
+    import github_sync
+    from models import User
+
+    user = await db.get(User, job.user_id)
+    return await github_sync.sync_user(db, user, transport=offline_github())
+
+async def first_event(app, user, path):
+    """Time to the first chunk of a streaming response, then disconnect.
+
+    The ASGI client buffers whole bodies, which never ends for the event stream.
+    """
+    first_chunk = asyncio.Event()
+    status = {}
+    token = user.headers["Authorization"].split()[1]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": f"token={token}".encode(),
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80), "root_path": "",
+    }
+
+    async def receive():
+        await first_chunk.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and (message.get("body") or not message.get("more_body")):
+            first_chunk.set()
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await first_chunk.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return status.get("code")
+
+def import_payload(i):
+    rows = [{"resource": "tasks", "id": n, "title": f"Imported {i}-{n}", "completed": n % 2 == 0,
+             "created_at": "2024-03-01T09:00:00Z", "tags": ["imported"]} for n in range(20)]
+    rows += [{"resource": "sessions", "duration": 25, "completed": True, "task_id": n,
+              "started_at": "2024-03-01T10:00:00Z"} for n in range(20)]
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+def scenarios():
+    def auth(user, url, **kwargs):
+        return {"url": url, "headers": dict(user.headers, **kwargs.pop("headers", {})), **kwargs}
+
+    def pick(items, i):
+        return items[i % len(items)]
+
+    def remember_etag(key):
+        def after(user, response):
+            user.etags[key] = response.headers.get("etag")
+        return after
+
+    return [
+        Scenario("GET", "/api/health"),
+        Scenario("POST", "/api/auth/register", lambda user, i: {
+            "url": "/api/auth/register",
+            "json": {"username": f"new-{uuid.uuid4().hex}", "email": f"{uuid.uuid4().hex}@example.com", "password": "benchmark"},
+        }),
+        Scenario("POST", "/api/auth/login", lambda user, i: {
+            "url": "/api/auth/login", "data": {"username": user.username, "password": "benchmark"},
+        }),
+        Scenario("GET", "/api/auth/me", lambda user, i: auth(user, "/api/auth/me")),
+        Scenario("GET", "/api/dashboard-stats", lambda user, i: auth(user, "/api/dashboard-stats")),
+        Scenario("GET", "/api/bootstrap", lambda user, i: auth(user, "/api/bootstrap")),
+        Scenario("GET", "/api/tasks/", lambda user, i: auth(user, "/api/tasks/"), after=remember_etag("tasks")),
+        Scenario("GET", "/api/tasks/", lambda user, i: auth(user, "/api/tasks/", headers={"If-None-Match": user.etags.get("tasks") or ""}),
+                 expect=304, name="GET /api/tasks/ (If-None-Match)"),
+        Scenario("GET", "/api/tasks/", lambda user, i: auth(user, "/api/tasks/", params={"completed": "false", "priority": "high", "tag": "project-3"}),
+                 name="GET /api/tasks/ (filtered)"),
+        Scenario("GET", "/api/tasks/tags", lambda user, i: auth(user, "/api/tasks/tags")),
+        Scenario("GET", "/api/tasks/search", lambda user, i: auth(user, "/api/tasks/search", params={"q": f"task {i % 50}"})),
+        Scenario("GET", "/api/pomodoro/sessions", lambda user, i: auth(user, "/api/pomodoro/sessions")),
+        Scenario("GET", "/api/github/stats", lambda user, i: auth(user, "/api/github/stats")),
+        Scenario("GET", "/api/github/stats", lambda user, i: auth(user, "/api/github/stats", params={"bucket": "week"}),
+                 name="GET /api/github/stats (weekly)"),
+        Scenario("GET", "/api/insights/", lambda user, i: auth(user, "/api/insights/")),
+        Scenario("GET", "/api/export", lambda user, i: auth(user, "/api/export")),
+        Scenario("GET", "/api/stream", name="GET /api/stream (first event)"),
+        Scenario("PUT", "/api/auth/me", lambda user, i: auth(user, "/api/auth/me", json={"full_name": f"Bench {i}"})),
+        Scenario("POST", "/api/tasks/", lambda user, i: auth(user, "/api/tasks/", json={
+            "title": f"New task {i}", "priority": "high", "tags": ["work", "new"],
+        }), after=lambda user, response: user.created_task_ids.append(response.json()["id"])),
+        Scenario("PUT", "/api/tasks/{task_id}", lambda user, i: auth(
+            user, f"/api/tasks/{pick(user.task_ids, i)}", json={"completed": i % 2 == 0, "tags": ["work", "edited"]}
+        )),
+        Scenario("POST", "/api/tasks/bulk", lambda user, i: auth(user, "/api/tasks/bulk", json={"operations": [
+            {"action": "update", "id": pick(user.task_ids, i * 20 + n), "task": {"priority": "low"}} for n in range(20)
+        ]})),
+        Scenario("DELETE", "/api/tasks/{task_id}", lambda user, i: auth(user, f"/api/tasks/{user.created_task_ids.pop()}")),
+        Scenario("POST", "/api/pomodoro/sessions", lambda user, i: auth(user, "/api/pomodoro/sessions", json={
+            "duration": 25, "task_id": pick(user.task_ids, i),
+        }), after=lambda user, response: user.session_ids.append(response.json()["id"])),
+        Scenario("PUT", "/api/pomodoro/sessions/{session_id}", lambda user, i: auth(
+            user, f"/api/pomodoro/sessions/{pick(user.session_ids, i)}", json={"completed": True}
+        )),
+        Scenario("POST", "/api/insights/generate", lambda user, i: auth(user, "/api/insights/generate")),
+        Scenario("POST", "/api/github/sync", lambda user, i: auth(user, "/api/github/sync"), expect=202,
+                 after=lambda user, response: user.job_ids.append(response.json()["job_id"])),
+        Scenario("GET", "/api/github/sync/{job_id}", lambda user, i: auth(user, f"/api/github/sync/{pick(user.job_ids, i)}")),
+        Scenario("POST", "/api/import", lambda user, i: auth(user, "/api/import", files={"file": ("history.ndjson", import_payload(i))}),
+                 concurrency=2),
+    ]
+
+async def run_scenario(app, client, scenario, users, requests, concurrency):
+    latencies, queries, errors = [], [], []
+    semaphore = asyncio.Semaphore(min(concurrency, scenario.concurrency or concurrency))
+
+    async def call(i):
+        user = users[i % len(users)]
+        async with semaphore:
+            counter = [0]
+            _query_count.set(counter)
+            start = time.perf_counter()
+            if scenario.path == "/api/stream":
+                status, response = await first_event(app, user, scenario.path), None
+            else:
+                kwargs = scenario.build(user, i)
+                response = await client.request(scenario.method, **kwargs)
+                status = response.status_code
+            latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(counter[0])
+        if status != scenario.expect:
+            errors.append(f"{status}: {response.text[:200] if response is not None else ''}")
+        elif scenario.after:
+            scenario.after(user, response)
+
+    start = time.perf_counter()
+    # Each task runs in a copy of the current context, so query counts stay per request
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "queries_mean": round(sum(queries) / len(queries), 2),
+        "queries_max": max(queries),
+    }
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous run: slower median beyond the tolerance, or more queries."""
+    regressions = []
+    settings = ("users", "tasks_per_user", "sessions_per_user", "days", "requests", "concurrency", "database")
+    changed = [key for key in settings if baseline.get("meta", {}).get(key) != results["meta"][key]]
+    if changed:
+        print(f"warning: baseline was recorded with different settings ({', '.join(changed)})")
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        if current["errors"]:
+            regressions.append(f"{name}: {current['errors']} failed requests ({current['first_error']})")
+        # Tails are reported but swing too much between runs to gate on
+        limit = previous["p50_ms"] * (1 + tolerance)
+        if current["p50_ms"] > limit and current["p50_ms"] - previous["p50_ms"] > NOISE_FLOOR_MS:
+            regressions.append(f"{name}: p50 {current['p50_ms']} ms, baseline {previous['p50_ms']} ms")
+        if current["queries_mean"] > previous["queries_mean"] + QUERY_SLACK:
+            regressions.append(f"{name}: {current['queries_mean']} queries per request, baseline {previous['queries_mean']}")
+    missing = sorted(set(baseline.get("endpoints", {})) - set(results["endpoints"]))
+    regressions.extend(f"{name}: not run" for name in missing)
+    return regressions
+
+def uncovered_routes(app, covered):
+    paths = app.openapi()["paths"]
+    routes = {f"{method.upper()} {path}" for path, methods in paths.items() for method in methods}
+    return sorted(routes - covered)
+
+async def main(args):
+    import httpx
+    from sqlalchemy import event
+    from database import engine
+    from jobs import job_queue
+    import main as app_module
+
+    app = app_module.app
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        counter = _query_count.get()
+        if counter is not None:
+            counter[0] += 1
+
+    async with app.router.lifespan_context(app):
+        job_queue.register("github_sync", offline_sync)
+        users = await seed(args.users, args.tasks, args.sessions, args.days, uuid.uuid4().hex[:8])
+
+        # Unhandled errors become 500s and are counted, as a server would
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            selected = [s for s in scenarios() if not args.only or any(part in s.name for part in args.only)]
+            results = {
+                "meta": {
+                    "users": args.users, "tasks_per_user": args.tasks, "sessions_per_user": args.sessions,
+                    "days": args.days, "requests": args.requests, "concurrency": args.concurrency,
+                    "database": engine.dialect.name, "python": platform.python_version(),
+                    "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                },
+                "endpoints": {},
+            }
+            print(f"{'route':<44}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'queries':>9}{'errors':>8}")
+            for scenario in selected:
+                result = await run_scenario(app, client, scenario, users, args.requests, args.concurrency)
+                results["endpoints"][scenario.name] = result
+                print(f"{scenario.name:<44}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                      f"{result['throughput_rps']:>9.0f}{result['queries_mean']:>9.1f}{result['errors']:>8}")
+
+    if not args.only:
+        missing = uncovered_routes(app, {f"{s.method} {s.path}" for s in selected})
+        if missing:
+            print(f"routes without a scenario: {', '.join(missing)}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="database to seed and run against (default: a new SQLite file)")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks per user")
+    parser.add_argument("--sessions", type=int, default=2000, help="Pomodoro sessions per user")
+    parser.add_argument("--days", type=int, default=90, help="days of GitHub stats per user")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", action="append", help="run routes whose name contains this (repeatable)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="compare against a saved results file")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed p50 slowdown, as a fraction")
+    args = parser.parse_args()
+
+    # Before anything imports database.py
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    sys.exit(asyncio.run(main(args)))
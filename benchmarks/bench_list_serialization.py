@@ -0,0 +1,139 @@
+"""Per-row cost of the list endpoints' read path at 10k rows.
+
+Compares the previous path (load ORM objects, validate them through the
+``from_attributes`` response models, encode with json) with the column
+select + orjson path the endpoints use now. Both include the query.
+
+    python benchmarks/bench_list_serialization.py --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+
+from database import SessionLocal, engine
+from models import AIInsight, Base, GitHubStats, PomodoroSession, Task, TaskTag, User
+from routers.github import GitHubStatsResponse, fetch_github_stats
+from routers.insights import InsightResponse, fetch_insights
+from routers.pomodoro import PomodoroResponse, fetch_sessions
+from routers.tasks import TaskResponse, fetch_tasks
+from serialization import dumps
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    start = datetime(2024, 1, 1)
+    async with SessionLocal() as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        await db.execute(insert(Task), [
+            {"id": i + 1, "user_id": user.id, "title": f"Task {i}", "description": "Benchmark task",
+             "priority": "medium", "completed": i % 3 == 0, "time_spent": 25, "created_at": start + timedelta(minutes=i),
+             "updated_at": start + timedelta(minutes=i)}
+            for i in range(rows)
+        ])
+        await db.execute(insert(TaskTag), [
+            {"task_id": i + 1, "user_id": user.id, "name": name, "position": position}
+            for i in range(rows) for position, name in enumerate(("work", "bench"))
+        ])
+        await db.execute(insert(PomodoroSession), [
+            {"user_id": user.id, "duration": 25, "completed": True, "session_type": "work",
+             "started_at": start + timedelta(minutes=30 * i)}
+            for i in range(rows)
+        ])
+        await db.execute(insert(GitHubStats), [
+            {"user_id": user.id, "date": start + timedelta(days=i), "commits": i % 7, "lines_added": 0,
+             "lines_removed": 0, "pull_requests": 0, "issues": 0, "repositories": json.dumps(["devdash", "api"])}
+            for i in range(rows)
+        ])
+        await db.execute(insert(AIInsight), [
+            {"user_id": user.id, "type": f"type_{i}", "title": "Insight", "description": "Benchmark insight",
+             "confidence": 80, "actionable": True, "created_at": start + timedelta(minutes=i)}
+            for i in range(rows)
+        ])
+        await db.commit()
+        return user.id
+
+async def orm_tasks(db, user_id, rows):
+    objs = (await db.scalars(select(Task).where(Task.user_id == user_id).order_by(
+        Task.created_at.desc(), Task.id.desc()).limit(rows))).all()
+    return objs, TaskResponse
+
+async def orm_sessions(db, user_id, rows):
+    objs = (await db.scalars(select(PomodoroSession).where(PomodoroSession.user_id == user_id).order_by(
+        PomodoroSession.started_at.desc()).limit(rows))).all()
+    return objs, PomodoroResponse
+
+async def orm_github(db, user_id, rows):
+    objs = (await db.scalars(select(GitHubStats).where(GitHubStats.user_id == user_id).order_by(
+        GitHubStats.date.desc()))).all()
+    for stat in objs:
+        stat.repositories = json.loads(stat.repositories) if stat.repositories else []
+    return objs, GitHubStatsResponse
+
+async def orm_insights(db, user_id, rows):
+    objs = (await db.scalars(select(AIInsight).where(AIInsight.user_id == user_id).order_by(
+        AIInsight.created_at.desc()).limit(rows))).all()
+    return objs, InsightResponse
+
+async def old_path(load, user_id, rows):
+    # What FastAPI does with a response_model: validate, dump to JSON types, json.dumps
+    async with SessionLocal() as db:
+        objs, model = await load(db, user_id, rows)
+        adapter = TypeAdapter(List[model])
+        content = adapter.dump_python(adapter.validate_python(objs, from_attributes=True), mode="json")
+        return json.dumps(content).encode()
+
+async def new_path(fetch, user_id, rows):
+    async with SessionLocal() as db:
+        return dumps(await fetch(db, user_id, rows))
+
+async def timed(factory, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await factory()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+async def main(rows: int, repeat: int):
+    user_id = await seed(rows)
+    cases = {
+        "tasks": (orm_tasks, lambda db, uid, n: fetch_tasks(db, uid, limit=n)),
+        "sessions": (orm_sessions, fetch_sessions),
+        "github_stats": (orm_github, lambda db, uid, n: fetch_github_stats(db, uid)),
+        "insights": (orm_insights, fetch_insights),
+    }
+    print(f"{rows} rows per endpoint, best of {repeat}")
+    print(f"{'endpoint':<14}{'orm+pydantic':>16}{'columns+orjson':>18}{'speedup':>10}")
+    for name, (load, fetch) in cases.items():
+        if name == "tasks":
+            async def new_fetch(db, uid, n, fetch=fetch):
+                return (await fetch(db, uid, n))[0]
+        else:
+            new_fetch = fetch
+        old, old_body = await timed(lambda: old_path(load, user_id, rows), repeat)
+        new, new_body = await timed(lambda: new_path(new_fetch, user_id, rows), repeat)
+        assert len(json.loads(old_body)) == len(json.loads(new_body)) == rows
+        print(f"{name:<14}{old / rows * 1e6:>13.1f} us{new / rows * 1e6:>15.1f} us{old / new:>9.1f}x")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
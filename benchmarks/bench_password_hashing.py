@@ -0,0 +1,74 @@
+"""Event-loop latency while concurrent logins verify bcrypt hashes.
+
+Compares verifying inline in the coroutine (the old login handler) with
+the bounded executor used by ``auth_utils``. A ticker coroutine sleeps for
+a fixed interval and records how late it wakes up; that lateness is what
+every other in-flight request would see.
+
+    python benchmarks/bench_password_hashing.py --logins 20 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+TICK_SECONDS = 0.005
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - start - TICK_SECONDS) * 1000)
+
+async def run(mode: str, logins: int, hashed: str):
+    import auth_utils
+
+    async def inline_login():
+        auth_utils.pwd_context.verify_and_update("correct horse", hashed)
+
+    async def offloaded_login():
+        await auth_utils.verify_and_update_password_async("correct horse", hashed)
+
+    login = inline_login if mode == "inline" else offloaded_login
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await tick
+    lags.sort()
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags), 2),
+        "lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1], 2),
+        "lag_max_ms": round(lags[-1], 2),
+        "ticks": len(lags),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    import auth_utils
+
+    hashed = auth_utils.get_password_hash("correct horse")
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, "
+          f"{auth_utils.PASSWORD_HASH_WORKERS} hash workers")
+    for mode in ("inline", "executor"):
+        print(asyncio.run(run(mode, args.logins, hashed)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Latency of GET /api/tasks/search's query at 100k tasks.
+
+Seeds ``--tasks`` tasks with generated titles and descriptions, spread over
+``--users`` users (the first user owns half of them), then times
+``search.search_tasks`` for common, rare, phrase and excluding queries
+against the busiest user. Uses ``DATABASE_URL`` when set (e.g. PostgreSQL,
+to exercise the GIN index), otherwise a fresh SQLite file.
+
+    python benchmarks/bench_search.py --tasks 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert
+
+from database import SessionLocal, engine
+from models import Task, User
+from routers.tasks import TASK_COLUMNS
+import migrations
+import search
+
+WORDS = (
+    "login signup dashboard export import api cache database index query release deploy review refactor "
+    "test benchmark metrics sync github token session timer focus report chart bug crash memory latency "
+    "upgrade migration schema replica stream event insight streak tag filter search page mobile design"
+).split()
+RARE_WORDS = ("kubernetes", "webauthn", "localization", "accessibility")
+
+QUERIES = {
+    "common word": "login",
+    "two words": "database migration",
+    "rare word": "webauthn",
+    "phrase": '"memory latency"',
+    "excluding": "deploy -release",
+    "no match": "nonexistent",
+}
+
+def text(rnd, words):
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+async def seed(tasks: int, users: int, run_id: str):
+    rnd = random.Random(42)
+    start = datetime.now() - timedelta(days=365)
+    user_ids = []
+    async with SessionLocal() as db:
+        for n in range(users):
+            user = User(email=f"search-{run_id}-{n}@example.com", username=f"search-{run_id}-{n}", hashed_password="x")
+            db.add(user)
+            await db.flush()
+            user_ids.append(user.id)
+        await db.commit()
+
+        rows = []
+        for i in range(tasks):
+            owner = user_ids[0] if i % 2 == 0 or users == 1 else user_ids[1 + i % (users - 1)]
+            description = text(rnd, rnd.randint(5, 40))
+            if i % 500 == 0:
+                description += " " + rnd.choice(RARE_WORDS)
+            rows.append({
+                "user_id": owner, "title": text(rnd, rnd.randint(2, 6)).capitalize(), "description": description,
+                "priority": "medium", "completed": False, "time_spent": 0,
+                "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i),
+            })
+        for offset in range(0, len(rows), 5000):
+            await db.execute(insert(Task), rows[offset:offset + 5000])
+            await db.commit()
+    return user_ids[0]
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    started = time.perf_counter()
+    user_id = await seed(args.tasks, args.users, str(int(time.time())))
+    print(f"seeded {args.tasks} tasks in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+
+    print(f"{'query':<14}{'results':>9}{'p50':>10}{'p95':>10}")
+    async with SessionLocal() as db:
+        for name, q in QUERIES.items():
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                rows, _ = await search.search_tasks(db, user_id, q, TASK_COLUMNS, args.limit)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{name:<14}{len(rows):>9}{statistics.median(timings):>8.1f}ms{p95:>8.1f}ms")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""POST /api/pomodoro/sessions under load, committing directly vs write-behind.
+
+Each mode runs in a fresh process (``SESSION_WRITE_BEHIND`` is read at
+import) against a fresh SQLite file, or ``DATABASE_URL`` when set. It
+seeds ``--users`` users, sends ``--requests`` session creates with
+``--concurrency`` in flight through an in-process ``httpx`` ASGI client,
+and reports request latency, throughput, and the time until every session
+is committed (for write-behind, including the final flush).
+
+    python benchmarks/bench_session_writes.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = ("direct", "write-behind")
+
+async def child(args):
+    sys.path.insert(0, ROOT)
+    import httpx
+    from sqlalchemy import func, select
+    from auth_utils import create_access_token
+    from database import SessionLocal
+    from models import PomodoroSession, User
+    from write_behind import session_writes
+    import main
+
+    app = main.app
+    async with app.router.lifespan_context(app):
+        run_id = uuid.uuid4().hex[:8]
+        headers = []
+        async with SessionLocal() as db:
+            for n in range(args.users):
+                username = f"writes-{run_id}-{n}"
+                db.add(User(email=f"{username}@example.com", username=username, hashed_password="x"))
+                headers.append({"Authorization": f"Bearer {create_access_token({'sub': username}, timedelta(hours=1))}"})
+            await db.commit()
+
+        transport = httpx.ASGITransport(app=app)
+        latencies, statuses = [], {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def create(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/api/pomodoro/sessions", headers=headers[i % len(headers)], json={
+                        "duration": 25, "completed": i % 3 != 0, "client_ref": f"{run_id}-{i}",
+                    })
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(create(i) for i in range(args.requests)))
+            answered = time.perf_counter()
+            if session_writes.enabled:
+                await session_writes.flush()
+            committed = time.perf_counter()
+
+        async with SessionLocal() as db:
+            stored = await db.scalar(select(func.count(PomodoroSession.id)).where(
+                PomodoroSession.client_ref.like(f"{run_id}-%")
+            ))
+
+    latencies.sort()
+    print(json.dumps({
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "throughput_rps": args.requests / (answered - started),
+        "committed_s": committed - started,
+        "stored": stored,
+        "statuses": statuses,
+    }))
+
+def run(mode: str, args):
+    env = dict(
+        os.environ,
+        SESSION_WRITE_BEHIND="true" if mode == "write-behind" else "false",
+        WRITE_BEHIND_SPILL_DIR=tempfile.mkdtemp(),
+        BCRYPT_ROUNDS="4",
+    )
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'writes.db')}")
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--users", str(args.users),
+         "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(args):
+    print(f"{args.requests} creates, {args.concurrency} in flight")
+    print(f"{'mode':<14}{'p50':>10}{'p95':>10}{'req/s':>9}{'committed':>11}{'stored':>8}  statuses")
+    for mode in MODES:
+        result = run(mode, args)
+        print(f"{mode:<14}{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms{result['throughput_rps']:>9.0f}"
+              f"{result['committed_s']:>10.2f}s{result['stored']:>8}  {result['statuses']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args))
+    else:
+        main(args)
@@ -0,0 +1,177 @@
+"""GitHub sync against a fake GitHub served by ``httpx.MockTransport``.
+
+Runs ``github_sync.sync_user`` end to end on a fresh SQLite file (or
+``DATABASE_URL``) without the network, and checks that:
+
+- paginated repositories, commits, issues and pull requests are counted
+  per day, stored, and reach the dashboard rollup;
+- a second sync revalidates every page with ``If-None-Match`` and is
+  answered from ``304 Not Modified`` replies;
+- a ``403`` with ``X-RateLimit-Remaining: 0`` or a ``429`` with
+  ``Retry-After`` is waited out and retried;
+- a wait longer than ``max_rate_limit_wait``, or a page still limited
+  after every attempt, raises ``RateLimitExceeded``.
+
+    python checks/check_github_sync.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'check.db')}"
+
+import httpx
+from sqlalchemy import select
+
+from database import SessionLocal, engine
+from models import GitHubStats, User
+import github_sync
+import migrations
+import rollups
+
+TODAY = date(2026, 3, 31)
+USERNAME = "octocat"
+
+def timestamp(days_ago: int):
+    return f"{TODAY - timedelta(days=days_ago)}T12:00:00Z"
+
+class FakeGitHub:
+    """Two repositories; ``/users/{name}/repos`` is split over two pages.
+
+    Every page carries an ETag and honours ``If-None-Match``. ``limit``
+    maps a path to the rate-limit replies to send before answering it.
+    """
+
+    def __init__(self):
+        self.pages = {
+            f"/users/{USERNAME}/repos": [{"name": "app", "full_name": f"{USERNAME}/app", "pushed_at": timestamp(0)}],
+            f"/users/{USERNAME}/repos?page=2": [{"name": "lib", "full_name": f"{USERNAME}/lib", "pushed_at": timestamp(1)}],
+            f"/repos/{USERNAME}/app/commits": [
+                {"commit": {"author": {"date": timestamp(0)}}},
+                {"commit": {"author": {"date": timestamp(0)}}},
+                {"commit": {"author": {"date": timestamp(2)}}},
+            ],
+            f"/repos/{USERNAME}/lib/commits": [{"commit": {"author": {"date": timestamp(2)}}}],
+            f"/repos/{USERNAME}/app/issues": [
+                {"created_at": timestamp(0)},
+                {"created_at": timestamp(2), "pull_request": {}},
+                # Updated in the window but opened before it
+                {"created_at": timestamp(90)},
+            ],
+            f"/repos/{USERNAME}/lib/issues": [],
+        }
+        self.limit = {}
+        self.requests = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request):
+        page = request.url.params.get("page")
+        key = request.url.path + (f"?page={page}" if page else "")
+        self.requests.append((key, request.headers.get("If-None-Match")))
+
+        replies = self.limit.get(key)
+        if replies:
+            return replies.pop(0)
+        if key not in self.pages:
+            return httpx.Response(404, json={"message": "Not Found"})
+
+        etag = f'"{key}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        headers = {"ETag": etag, "X-RateLimit-Remaining": "4999"}
+        if key == f"/users/{USERNAME}/repos":
+            headers["Link"] = f'<{github_sync.GITHUB_API_URL}/users/{USERNAME}/repos?page=2>; rel="next"'
+        return httpx.Response(200, json=self.pages[key], headers=headers)
+
+async def check_sync(user_id: int):
+    github = FakeGitHub()
+    async with SessionLocal() as db:
+        user = await db.get(User, user_id)
+        result = await github_sync.sync_user(db, user, transport=github.transport, today=TODAY, days=30)
+        rows = {
+            row.date.date(): row for row in (await db.scalars(select(GitHubStats).where(GitHubStats.user_id == user_id))).all()
+        }
+        stats = await rollups.get_dashboard_stats(db, user_id, today=TODAY)
+
+    assert result == {"days": 30, "repositories": 2, "requests": 6, "not_modified": 0}, result
+    assert len(rows) == 30
+    today, two_days_ago = rows[TODAY], rows[TODAY - timedelta(days=2)]
+    assert (today.commits, today.issues, today.pull_requests) == (2, 1, 0)
+    assert (two_days_ago.commits, two_days_ago.issues, two_days_ago.pull_requests) == (2, 0, 1)
+    assert json.loads(two_days_ago.repositories) == ["app", "lib"]
+    assert rows[TODAY - timedelta(days=1)].commits == 0
+    assert stats["todayCommits"] == 2 and stats["weekCommits"] == 4, stats
+    print("sync: 2 repositories over 2 pages, 30 days stored, rollup updated")
+
+    async with SessionLocal() as db:
+        user = await db.get(User, user_id)
+        again = await github_sync.sync_user(db, user, transport=github.transport, today=TODAY, days=30)
+        stored = (await db.get(GitHubStats, today.id)).commits
+    revalidated = github.requests[6:]
+    assert all(etag for _, etag in revalidated), revalidated
+    assert again == {"days": 30, "repositories": 2, "requests": 6, "not_modified": 6}, again
+    assert stored == 2
+    print("etag: second sync revalidated all 6 pages, all 304 Not Modified, same data")
+
+async def check_rate_limits():
+    github = FakeGitHub()
+    path = f"/repos/{USERNAME}/app/commits"
+    github.limit[path] = [
+        httpx.Response(403, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 1)}),
+        httpx.Response(429, headers={"Retry-After": "1"}),
+    ]
+    async with github_sync.GitHubClient(transport=github.transport, cache=github_sync.ETagCache(16)) as client:
+        started = time.monotonic()
+        data, _ = await client.get_page(path)
+        waited = time.monotonic() - started
+    assert len(data) == 3 and client.requests == 3, client.requests
+    assert waited >= 1.5, waited
+    print(f"backoff: 403 rate limit and 429 Retry-After waited out ({waited:.1f}s), then served")
+
+    github.limit[path] = [httpx.Response(429, headers={"Retry-After": "30"})]
+    async with github_sync.GitHubClient(
+        transport=github.transport, cache=github_sync.ETagCache(16), max_rate_limit_wait=5
+    ) as client:
+        started = time.monotonic()
+        try:
+            await client.get_page(path)
+        except github_sync.RateLimitExceeded as exc:
+            assert 25 <= exc.retry_after <= 30, exc.retry_after
+        else:
+            raise AssertionError("expected RateLimitExceeded")
+    assert time.monotonic() - started < 1
+    print("backoff: a 30s Retry-After over the 5s limit fails fast with RateLimitExceeded")
+
+    github.limit[path] = [httpx.Response(429, headers={"Retry-After": "0"}) for _ in range(github_sync.MAX_ATTEMPTS)]
+    async with github_sync.GitHubClient(transport=github.transport, cache=github_sync.ETagCache(16)) as client:
+        try:
+            await client.get_page(path)
+        except github_sync.RateLimitExceeded:
+            pass
+        else:
+            raise AssertionError("expected RateLimitExceeded")
+    assert client.requests == github_sync.MAX_ATTEMPTS
+    print(f"backoff: still limited after {github_sync.MAX_ATTEMPTS} attempts raises RateLimitExceeded")
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    async with SessionLocal() as db:
+        user = User(email=f"{USERNAME}-{time.time_ns()}@example.com", username=f"{USERNAME}-{time.time_ns()}",
+                    github_username=USERNAME, github_access_token="token")
+        db.add(user)
+        await db.commit()
+
+    await check_sync(user.id)
+    await check_rate_limits()
+    await engine.dispose()
+    print("all GitHub sync checks passed")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""Read replica routing and fallback against two local SQLite files.
+
+The primary and a replica are separate files; the replica is a copy of the
+primary taken after seeding, so anything written later shows up on the
+primary only, like replication lag that never catches up. A second,
+unreachable replica is listed first. Checks that:
+
+- read-only sessions and endpoints are served by the reachable replica,
+  and the unreachable one is skipped and reported unhealthy;
+- with no replica available, reads fall back to the primary;
+- after a write the client gets the read-your-writes cookie and its reads
+  stay on the primary until it expires, while a client without the cookie
+  (e.g. one served by another worker before) keeps reading the replica.
+
+    python checks/check_read_replicas.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+DIRECTORY = tempfile.mkdtemp()
+PRIMARY = os.path.join(DIRECTORY, "primary.db")
+REPLICA = os.path.join(DIRECTORY, "replica.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{os.path.join(DIRECTORY, 'missing', 'down.db')},sqlite:///{REPLICA}"
+os.environ["READ_YOUR_WRITES_SECONDS"] = "1"
+os.environ["DB_AUTO_MIGRATE"] = "false"
+
+import httpx
+from sqlalchemy import select
+
+from auth_utils import create_access_token
+from database import READ_YOUR_WRITES_COOKIE, SessionLocal, engine, read_session, replicas
+from models import Task, User
+from main import app
+import migrations
+
+USERNAME = "replica-check"
+
+async def titles(db, user_id: int):
+    return set((await db.scalars(select(Task.title).where(Task.user_id == user_id))).all())
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    async with SessionLocal() as db:
+        user = User(email=f"{USERNAME}@example.com", username=USERNAME, hashed_password="x")
+        db.add(user)
+        await db.flush()
+        db.add(Task(title="replicated", user_id=user.id))
+        await db.commit()
+    await engine.dispose()
+    shutil.copy(PRIMARY, REPLICA)
+
+    # Only on the primary from here on
+    async with SessionLocal() as db:
+        db.add(Task(title="primary only", user_id=user.id))
+        await db.commit()
+    return user.id
+
+async def check_routing(user_id: int):
+    down, replica = replicas
+    async with read_session() as db:
+        seen = await titles(db, user_id)
+    assert seen == {"replicated"}, seen
+    assert not down.healthy and replica.healthy
+    print("routing: read served by the replica, unreachable replica skipped and marked down")
+
+    async with read_session() as db:
+        seen = await titles(db, user_id)
+    assert seen == {"replicated"}, seen
+    print("routing: the down replica stays skipped for REPLICA_RETRY_SECONDS")
+
+    async with read_session(primary=True) as db:
+        seen = await titles(db, user_id)
+    assert seen == {"replicated", "primary only"}, seen
+
+    replica.down_until = time.monotonic() + 60
+    try:
+        async with read_session() as db:
+            seen = await titles(db, user_id)
+    finally:
+        replica.down_until = 0.0
+    assert seen == {"replicated", "primary only"}, seen
+    print("fallback: with every replica down, reads go to the primary")
+
+async def check_read_your_writes(user_id: int):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': USERNAME}, timedelta(hours=1))}"}
+    transport = httpx.ASGITransport(app=app)
+
+    async def listed(client):
+        response = await client.get("/api/tasks/", headers=headers)
+        assert response.status_code == 200, response.text
+        return {task["title"] for task in response.json()}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client, \
+            httpx.AsyncClient(transport=transport, base_url="http://check") as other:
+        assert await listed(client) == {"replicated"}
+
+        response = await client.post("/api/tasks/", headers=headers, json={"title": "written"})
+        assert response.status_code == 200, response.text
+        assert READ_YOUR_WRITES_COOKIE in client.cookies
+        assert await listed(client) == {"replicated", "primary only", "written"}
+        print("read-your-writes: the write set the cookie and the next read came from the primary")
+
+        assert await listed(other) == {"replicated"}
+        print("read-your-writes: a client without the cookie still reads the replica")
+
+        await asyncio.sleep(1.2)
+        assert await listed(client) == {"replicated"}
+        print("read-your-writes: after READ_YOUR_WRITES_SECONDS reads return to the replica")
+
+async def main():
+    user_id = await seed()
+    async with app.router.lifespan_context(app):
+        await check_routing(user_id)
+        await check_read_your_writes(user_id)
+    print("all read replica checks passed")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Dashboard rollup days when the server's local date is not the UTC date.
+
+Runs in a time zone chosen so that the local date differs from today's
+UTC date whenever the check runs, on a fresh SQLite file (or
+``DATABASE_URL``), and checks that a change and its undo land on the same
+rollup day:
+
+- a completed Pomodoro session created through the API, then marked not
+  completed, leaves no focus time behind;
+- the same through the write-behind handler (``apply_session_changes``);
+- a task completed and then reopened leaves no completed task behind.
+
+    python checks/check_rollup_days.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'check.db')}"
+# UTC-12 is a day behind UTC before noon, UTC+14 a day ahead from 10:00
+os.environ["TZ"] = "Etc/GMT+12" if datetime.now(timezone.utc).hour < 12 else "Etc/GMT-14"
+time.tzset()
+
+import httpx
+from sqlalchemy import select
+
+from auth_utils import create_access_token
+from database import SessionLocal, engine
+from models import DailyUserStats, PomodoroSession, User
+from main import app
+from routers.pomodoro import apply_session_changes
+import migrations
+
+async def rollup(user_id: int):
+    async with SessionLocal() as db:
+        rows = (await db.scalars(select(DailyUserStats).where(DailyUserStats.user_id == user_id))).all()
+    return {row.day: (row.focus_minutes, row.completed_sessions, row.completed_tasks) for row in rows}
+
+async def new_user():
+    username = f"rollup-{uuid.uuid4().hex[:8]}"
+    async with SessionLocal() as db:
+        user = User(email=f"{username}@example.com", username=username, hashed_password="x")
+        db.add(user)
+        await db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': username}, timedelta(hours=1))}"}
+    return user.id, headers
+
+async def check_sessions(client):
+    user_id, headers = await new_user()
+    response = await client.post("/api/pomodoro/sessions", headers=headers, json={"duration": 25, "completed": True})
+    assert response.status_code == 200, response.text
+    created = await rollup(user_id)
+    assert list(created.values()) == [(25, 1, 0)], created
+
+    response = await client.put(f"/api/pomodoro/sessions/{response.json()['id']}", headers=headers, json={"completed": False})
+    assert response.status_code == 200, response.text
+    undone = await rollup(user_id)
+    assert undone == {day: (0, 0, 0) for day in created}, undone
+    stats = (await client.get("/api/dashboard-stats", headers=headers)).json()
+    assert stats["todayFocusTime"] == 0 and stats["weekFocusTime"] == 0, stats
+    print("sessions: create then un-complete lands on one UTC day and leaves no focus time")
+
+async def check_queued_sessions():
+    user_id, _ = await new_user()
+    async with SessionLocal() as db:
+        await apply_session_changes(db, [{
+            "op": "create", "user_id": user_id, "client_ref": "queued", "duration": 25,
+            "session_type": "work", "task_id": None, "completed": True,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }])
+    created = await rollup(user_id)
+    assert list(created.values()) == [(25, 1, 0)], created
+
+    async with SessionLocal() as db:
+        session_id = await db.scalar(select(PomodoroSession.id).where(PomodoroSession.user_id == user_id))
+        await apply_session_changes(db, [{
+            "op": "update", "user_id": user_id, "session_id": session_id, "fields": {"completed": False},
+        }])
+    undone = await rollup(user_id)
+    assert undone == {day: (0, 0, 0) for day in created}, undone
+    print("write-behind: queued create then un-complete lands on one UTC day")
+
+async def check_tasks(client):
+    user_id, headers = await new_user()
+    task = (await client.post("/api/tasks/", headers=headers, json={"title": "t"})).json()
+    response = await client.put(f"/api/tasks/{task['id']}", headers=headers, json={"completed": True})
+    assert response.status_code == 200, response.text
+    completed = await rollup(user_id)
+    assert list(completed.values()) == [(0, 0, 1)], completed
+
+    response = await client.put(f"/api/tasks/{task['id']}", headers=headers, json={"completed": False})
+    assert response.status_code == 200, response.text
+    reopened = await rollup(user_id)
+    assert reopened == {day: (0, 0, 0) for day in completed}, reopened
+    print("tasks: complete then reopen lands on one UTC day")
+
+async def main():
+    local, utc = datetime.now().date(), datetime.now(timezone.utc).date()
+    assert local != utc, (local, utc)
+    print(f"local date {local}, UTC date {utc} ({os.environ['TZ']})")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+            await check_sessions(client)
+            await check_queued_sessions()
+            await check_tasks(client)
+    print("all rollup day checks passed")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,24 +1,210 @@
-from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+import contextvars
+import itertools
+import logging
+import math
 import os
+import time
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool settings (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+# Optional read replicas, comma-separated, for the read-only endpoints
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a replica that failed to connect is skipped
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+# How long a client's reads stay on the primary after it writes
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+# Carries that deadline with the client, so whichever worker serves the
+# next read honours it
+READ_YOUR_WRITES_COOKIE = "devdash_primary_until"
+
+def async_database_url(url: str):
+    """Point a plain DATABASE_URL at the matching asyncio driver."""
+    url = make_url(url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        query = dict(url.query)
+        # asyncpg spells libpq's sslmode as ssl
+        sslmode = query.pop("sslmode", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def engine_options(url):
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+_url = async_database_url(DATABASE_URL)
+engine = create_async_engine(_url, **engine_options(_url))
+# Query counts, DB time and slow-query log per request, see metrics.py
+metrics.instrument(engine)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+class Replica:
+    def __init__(self, url: str):
+        url = async_database_url(url)
+        self.name = url.render_as_string(hide_password=True)
+        self.engine = create_async_engine(url, **engine_options(url))
+        self.sessionmaker = async_sessionmaker(bind=self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.down_until = 0.0
+        metrics.instrument(self.engine)
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+replicas = [Replica(url) for url in DATABASE_REPLICA_URLS]
+_replica_turn = itertools.count()
+# Whether the request the current task is serving wrote, see note_write
+_request_writes = contextvars.ContextVar("request_writes", default=None)
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+def note_write():
+    """Keep the client's reads on the primary while replicas catch up.
+
+    Marks the request in flight; ``ReadYourWritesMiddleware`` answers it
+    with the cookie. A no-op outside requests (jobs, write-behind flushes).
+    """
+    writes = _request_writes.get()
+    if writes is not None:
+        writes.append(True)
+
+def wrote_recently(cookies) -> bool:
+    """Whether a request's cookies say its client wrote moments ago."""
     try:
+        return float(cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+class ReadYourWritesMiddleware:
+    """Sets the read-your-writes cookie on responses to requests that wrote."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            return await self.app(scope, receive, send)
+
+        writes = []
+        token = _request_writes.set(writes)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writes:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + READ_YOUR_WRITES_SECONDS:.3f}; "
+                    f"Max-Age={math.ceil(READ_YOUR_WRITES_SECONDS)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
+
+def _replica_order(primary: bool = False):
+    if not replicas or primary:
+        return []
+    start = next(_replica_turn)
+    ordered = [replicas[(start + offset) % len(replicas)] for offset in range(len(replicas))]
+    return [replica for replica in ordered if replica.healthy]
+
+@asynccontextmanager
+async def read_session(primary: bool = False):
+    """A session for read-only queries: the next healthy replica in turn.
+
+    Falls back to the primary when no replica is configured or reachable.
+    Pass ``primary`` for clients that wrote within
+    ``READ_YOUR_WRITES_SECONDS`` (see ``wrote_recently``).
+    """
+    for replica in _replica_order(primary):
+        db = replica.sessionmaker()
+        try:
+            # Connect now, so an unreachable replica can be skipped
+            await db.connection()
+        except (DBAPIError, OSError) as exc:
+            await db.close()
+            replica.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning("Replica %s unavailable, skipping for %ss: %s", replica.name, REPLICA_RETRY_SECONDS, exc)
+            continue
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def replica_stats():
+    return [{"url": replica.name, "healthy": replica.healthy} for replica in replicas]
+
+async def dispose_engines():
+    await engine.dispose()
+    for replica in replicas:
+        await replica.engine.dispose()
+
+async def upsert(db: AsyncSession, model, rows: list, index_elements: list, update_columns: list, update_values: dict = None):
+    """INSERT ... ON CONFLICT (index_elements) DO UPDATE in one statement.
+
+    ``update_columns`` take the incoming values; ``update_values`` maps
+    further columns to expressions, e.g. ``{"n": model.n + 1}``.
+    """
+    if not rows:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={**{column: stmt.excluded[column] for column in update_columns}, **(update_values or {})}
+    )
+    await db.execute(stmt)
+
+async def insert_ignore(db: AsyncSession, model, rows: list, index_elements: list, returning=None):
+    """INSERT ... ON CONFLICT (index_elements) DO NOTHING.
+
+    With ``returning`` (e.g. the model), returns what was actually inserted.
+    """
+    if not rows:
+        return []
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(model).values(rows).on_conflict_do_nothing(index_elements=index_elements)
+    if returning is not None:
+        return (await db.scalars(stmt.returning(returning))).all()
+    await db.execute(stmt)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import rollups
+
+logger = logging.getLogger(__name__)
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 100))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))
+# Set by serve.py; other workers' events never reach this process's broker
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+
+class InProcessBroker:
+    """Fans change events out to the streams open in this process.
+
+    Any object with the same ``publish`` and ``subscribe`` methods (e.g. one
+    backed by Redis pub/sub) can replace ``broker`` when the app runs as
+    several processes. ``complete`` tells clients whether a stream sees
+    every change; while it is false they keep refetching after writes.
+    """
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+        self.complete = WEB_WORKERS == 1
+
+    async def publish(self, user_id: int, event: dict):
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client fell behind; rather than buffer without bound,
+                # replace its backlog with a request to reload everything.
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+        self.published += 1
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def stats(self):
+        return {
+            "users": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+broker = InProcessBroker()
+
+async def publish(user_id: int, type: str, **data):
+    """Tell the user's open streams that something changed; call after commit."""
+    try:
+        await broker.publish(user_id, {"type": type, **data})
+    except Exception:
+        # The write already succeeded; clients fall back to refetching
+        logger.exception("Could not publish %s event", type)
+
+async def publish_stats(db, user_id: int):
+    await publish(user_id, "stats", stats=await rollups.get_dashboard_stats(db, user_id))
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from database import upsert
+from models import GitHubStats
+import rollups
+import versions
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_SYNC_DAYS = int(os.getenv("GITHUB_SYNC_DAYS", 30))
+GITHUB_SYNC_CONCURRENCY = int(os.getenv("GITHUB_SYNC_CONCURRENCY", 4))
+GITHUB_MAX_RATE_LIMIT_WAIT = float(os.getenv("GITHUB_MAX_RATE_LIMIT_WAIT", 60))
+GITHUB_ETAG_CACHE_SIZE = int(os.getenv("GITHUB_ETAG_CACHE_SIZE", 2048))
+MAX_ATTEMPTS = 3
+
+class GitHubSyncError(Exception):
+    pass
+
+class RateLimitExceeded(GitHubSyncError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"GitHub rate limit exceeded, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class ETagCache:
+    """Bounded LRU of validators and bodies for previously fetched pages.
+
+    GitHub does not count ``304 Not Modified`` replies against the rate
+    limit, so revalidating an unchanged page is nearly free.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, etag: str, data, next_url):
+        self._entries[key] = (etag, data, next_url)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+etag_cache = ETagCache(GITHUB_ETAG_CACHE_SIZE)
+
+class GitHubClient:
+    """Small GitHub REST client with bounded concurrency.
+
+    Pass ``transport`` (e.g. ``httpx.MockTransport``) to run without the
+    network.
+    """
+
+    def __init__(
+        self,
+        token: str = None,
+        transport: httpx.AsyncBaseTransport = None,
+        base_url: str = GITHUB_API_URL,
+        concurrency: int = GITHUB_SYNC_CONCURRENCY,
+        cache: ETagCache = etag_cache,
+        max_rate_limit_wait: float = GITHUB_MAX_RATE_LIMIT_WAIT,
+    ):
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._client = httpx.AsyncClient(base_url=base_url, headers=headers, transport=transport, timeout=30)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache = cache
+        # Cache entries are per credential so private data never crosses users
+        self._cache_scope = hashlib.sha256((token or "").encode()).hexdigest()[:16]
+        self._resume_at = 0.0
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.requests = 0
+        self.not_modified = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def _wait_for_rate_limit(self):
+        delay = self._resume_at - time.time()
+        if delay <= 0:
+            return
+        if delay > self.max_rate_limit_wait:
+            raise RateLimitExceeded(delay)
+        await asyncio.sleep(delay)
+
+    def _note_rate_limit(self, response: httpx.Response):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            self._resume_at = max(self._resume_at, time.time() + float(retry_after))
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = float(response.headers.get("X-RateLimit-Reset", time.time() + 60))
+            self._resume_at = max(self._resume_at, reset)
+
+    async def get_page(self, url: str, params: dict = None):
+        """Fetch one page; returns ``(data, next_url)``."""
+        key = (self._cache_scope, str(self._client.build_request("GET", url, params=params).url))
+        cached = self._cache.get(key)
+
+        for attempt in range(MAX_ATTEMPTS):
+            headers = {"If-None-Match": cached[0]} if cached else {}
+            async with self._semaphore:
+                await self._wait_for_rate_limit()
+                response = await self._client.get(url, params=params, headers=headers)
+            self.requests += 1
+            self._note_rate_limit(response)
+
+            if response.status_code == 304 and cached:
+                self.not_modified += 1
+                return cached[1], cached[2]
+            if response.status_code in (403, 429) and (
+                "Retry-After" in response.headers or response.headers.get("X-RateLimit-Remaining") == "0"
+            ):
+                logger.info("GitHub rate limited on %s (attempt %d)", url, attempt + 1)
+                continue
+            if response.status_code in (404, 409):
+                # Missing or empty repositories have nothing to report
+                return [], None
+            if response.status_code >= 400:
+                raise GitHubSyncError(f"GitHub returned {response.status_code} for {url}")
+
+            data = response.json()
+            next_url = response.links.get("next", {}).get("url")
+            etag = response.headers.get("ETag")
+            if etag:
+                self._cache.put(key, etag, data, next_url)
+            return data, next_url
+
+        raise RateLimitExceeded(max(self._resume_at - time.time(), 0))
+
+    async def paginate(self, url: str, params: dict = None):
+        items = []
+        while url:
+            data, url = await self.get_page(url, params)
+            items.extend(data)
+            # The next link already carries the query string
+            params = None
+        return items
+
+def _day(timestamp: str):
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).date()
+
+async def _fetch_repository(client: GitHubClient, repo: dict, username: str, since: date):
+    full_name = repo["full_name"]
+    since_param = datetime.combine(since, datetime.min.time()).isoformat() + "Z"
+
+    commits, issues = await asyncio.gather(
+        client.paginate(f"/repos/{full_name}/commits", {"author": username, "since": since_param, "per_page": 100}),
+        client.paginate(f"/repos/{full_name}/issues", {"creator": username, "state": "all", "since": since_param, "per_page": 100}),
+    )
+
+    activity = {}
+
+    def bump(day, field):
+        counters = activity.setdefault(day, {"commits": 0, "pull_requests": 0, "issues": 0})
+        counters[field] += 1
+
+    for commit in commits:
+        bump(_day(commit["commit"]["author"]["date"]), "commits")
+    for issue in issues:
+        # ``since`` filters on update time; count items opened in the window
+        day = _day(issue["created_at"])
+        if day >= since:
+            bump(day, "pull_requests" if "pull_request" in issue else "issues")
+    return repo["name"], activity
+
+async def fetch_activity(client: GitHubClient, username: str, since: date):
+    """Daily commit, pull request and issue counts across a user's repositories."""
+    repos = await client.paginate(f"/users/{username}/repos", {"type": "owner", "sort": "pushed", "per_page": 100})
+    repos = [repo for repo in repos if not repo.get("pushed_at") or _day(repo["pushed_at"]) >= since]
+
+    results = await asyncio.gather(*(_fetch_repository(client, repo, username, since) for repo in repos))
+
+    days = {}
+    for name, activity in results:
+        for day, counters in activity.items():
+            totals = days.setdefault(day, {"commits": 0, "pull_requests": 0, "issues": 0, "repositories": set()})
+            for field, value in counters.items():
+                totals[field] += value
+            totals["repositories"].add(name)
+    return days, len(repos)
+
+async def sync_user(db, user, transport: httpx.AsyncBaseTransport = None, today: date = None, days: int = GITHUB_SYNC_DAYS):
+    """Fetch a user's recent GitHub activity and store one row per day.
+
+    Every day in the window is written, so days whose activity disappeared
+    (e.g. force-pushed commits) are reset. Line counts need one request per
+    commit and are not fetched; existing values are left untouched.
+    """
+    if not user.github_username:
+        raise GitHubSyncError("No GitHub account linked")
+
+    today = today or rollups.utc_today()
+    since = today - timedelta(days=days - 1)
+
+    async with GitHubClient(token=user.github_access_token, transport=transport) as client:
+        activity, repo_count = await fetch_activity(client, user.github_username, since)
+
+    rows = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        counters = activity.get(day, {})
+        rows.append({
+            "user_id": user.id,
+            "date": datetime.combine(day, datetime.min.time()),
+            "commits": counters.get("commits", 0),
+            "pull_requests": counters.get("pull_requests", 0),
+            "issues": counters.get("issues", 0),
+            "repositories": json.dumps(sorted(counters.get("repositories", ()))),
+        })
+
+    await upsert(
+        db, GitHubStats, rows,
+        index_elements=["user_id", "date"],
+        update_columns=["commits", "pull_requests", "issues", "repositories"]
+    )
+    await rollups.set_commits_bulk(db, user.id, {row["date"]: row["commits"] for row in rows})
+    await versions.bump(db, user.id, "github")
+    await db.commit()
+
+    return {
+        "days": len(rows),
+        "repositories": repo_count,
+        "requests": client.requests,
+        "not_modified": client.not_modified,
+    }
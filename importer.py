@@ -0,0 +1,268 @@
+"""Bulk import of historical tasks and Pomodoro sessions.
+
+Reads NDJSON (the format ``GET /api/export`` writes) or CSV, validates rows
+in chunks and inserts each chunk with one executemany per table, keeping
+the timestamps from the file. Rollups and insights are refreshed once at
+the end. Also runs from the command line:
+
+    python importer.py --user alice history.ndjson
+    python importer.py --user alice --format csv --resource sessions sessions.csv
+"""
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timezone
+import asyncio
+import csv
+import itertools
+import json
+import os
+import time
+
+from models import PomodoroSession, Task, TaskTag
+from routers.insights import refresh_insights
+import rollups
+import versions
+import events
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+# Row errors reported back; the import keeps going past them
+IMPORT_MAX_ERRORS = 100
+
+RESOURCES = ("tasks", "sessions")
+# Exported resources an import has no use for
+IGNORED_RESOURCES = ("github_stats", "insights")
+
+class TaskImport(BaseModel):
+    id: Optional[int] = None  # id in the source, used to link sessions
+    title: str = Field(min_length=1)
+    description: Optional[str] = None
+    priority: str = "medium"
+    completed: bool = False
+    deadline: Optional[datetime] = None
+    time_spent: int = Field(0, ge=0)
+    tags: List[str] = []
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class SessionImport(BaseModel):
+    duration: int = Field(ge=0)
+    session_type: str = "work"
+    completed: bool = False
+    task_id: Optional[int] = None  # source task id
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+
+MODELS = {"tasks": TaskImport, "sessions": SessionImport}
+
+class ImportReport:
+    def __init__(self):
+        self.tasks = 0
+        self.sessions = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def error(self, line: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        rows = self.tasks + self.sessions
+        return {
+            "tasks": self.tasks,
+            "sessions": self.sessions,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(rows / self.seconds) if self.seconds else rows,
+        }
+
+def read_rows(text_file, format: str, resource: Optional[str] = None):
+    """Yield ``(line, resource, raw_row)`` from an open text file, one line at a time.
+
+    NDJSON rows name their ``resource``, falling back to ``resource``;
+    CSV files hold a single resource, empty cells read as missing and tags
+    are ``;``-separated, as exported.
+    """
+    if format == "csv":
+        reader = csv.DictReader(text_file)
+        for row in reader:
+            raw = {key: value for key, value in row.items() if key and value != ""}
+            if resource == "tasks" and "tags" in raw:
+                raw["tags"] = [tag for tag in raw["tags"].split(";") if tag]
+            yield reader.line_num, resource, raw
+        return
+
+    for line, text in enumerate(text_file, start=1):
+        if not text.strip():
+            continue
+        try:
+            raw = json.loads(text)
+        except ValueError:
+            yield line, None, "invalid JSON"
+            continue
+        if not isinstance(raw, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        # Trailer line written at the end of an export
+        if raw.get("complete") is True and "resource" not in raw:
+            continue
+        yield line, raw.pop("resource", resource), raw
+
+def validate_chunk(rows):
+    """Turn raw rows into ``(line, resource, model_or_error)``."""
+    validated = []
+    for line, resource, raw in rows:
+        if isinstance(raw, str):
+            validated.append((line, resource, raw))
+        elif resource in IGNORED_RESOURCES:
+            continue
+        elif resource not in MODELS:
+            validated.append((line, resource, f"unknown resource {resource!r}"))
+        else:
+            try:
+                validated.append((line, resource, MODELS[resource].model_validate(raw)))
+            except ValidationError as exc:
+                first = exc.errors()[0]
+                field = ".".join(str(part) for part in first["loc"])
+                validated.append((line, resource, f"{field}: {first['msg']}" if field else first["msg"]))
+    return validated
+
+def _unique_tags(tags):
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag.strip()))
+
+async def _insert_tasks(db: AsyncSession, user_id: int, tasks, id_map: dict, now: datetime):
+    rows = []
+    for task in tasks:
+        created_at = task.created_at or task.updated_at or now
+        updated_at = task.updated_at or created_at
+        completed_at = task.completed_at or (updated_at if task.completed else None)
+        rows.append({
+            "user_id": user_id, "title": task.title, "description": task.description,
+            "priority": task.priority, "completed": task.completed, "deadline": task.deadline,
+            "time_spent": task.time_spent, "created_at": created_at, "updated_at": updated_at,
+            "completed_at": completed_at,
+        })
+    new_ids = (await db.scalars(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+    )).all()
+
+    tag_rows = []
+    for task, new_id in zip(tasks, new_ids):
+        if task.id is not None:
+            id_map[task.id] = new_id
+        tag_rows.extend(
+            {"task_id": new_id, "user_id": user_id, "name": name, "position": position}
+            for position, name in enumerate(_unique_tags(task.tags))
+        )
+    if tag_rows:
+        await db.execute(insert(TaskTag), tag_rows)
+
+async def _insert_sessions(db: AsyncSession, user_id: int, sessions, id_map: dict):
+    # Task ids not seen in this import may still name one of the user's tasks
+    unmapped = {s.task_id for s in sessions if s.task_id is not None and s.task_id not in id_map}
+    owned = set()
+    if unmapped:
+        owned = set((await db.scalars(
+            select(Task.id).where(Task.user_id == user_id, Task.id.in_(unmapped))
+        )).all())
+
+    def task_id(session):
+        if session.task_id in id_map:
+            return id_map[session.task_id]
+        return session.task_id if session.task_id in owned else None
+
+    await db.execute(insert(PomodoroSession), [
+        {"user_id": user_id, "duration": s.duration, "session_type": s.session_type,
+         "completed": s.completed, "task_id": task_id(s), "started_at": s.started_at,
+         "completed_at": s.completed_at}
+        for s in sessions
+    ])
+
+async def import_rows(db: AsyncSession, user_id: int, rows, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Import ``(line, resource, raw_row)`` tuples from ``read_rows``.
+
+    Each chunk is parsed and validated off the event loop, then written
+    with one executemany per table and committed. Rows that fail validation
+    are skipped and reported. Sessions are linked to tasks by the source
+    task ids, so tasks should come first, as they do in an export.
+    """
+    report = ImportReport()
+    id_map = {}
+    now = datetime.now(timezone.utc)
+
+    def next_chunk():
+        return validate_chunk(list(itertools.islice(rows, chunk_size)))
+
+    while True:
+        chunk = await asyncio.to_thread(next_chunk)
+        if not chunk:
+            break
+        valid = {name: [] for name in RESOURCES}
+        for line, resource, item in chunk:
+            if isinstance(item, str):
+                report.error(line, item)
+            else:
+                valid[resource].append(item)
+
+        if valid["tasks"]:
+            await _insert_tasks(db, user_id, valid["tasks"], id_map, now)
+        if valid["sessions"]:
+            await _insert_sessions(db, user_id, valid["sessions"], id_map)
+        await db.commit()
+        report.tasks += len(valid["tasks"])
+        report.sessions += len(valid["sessions"])
+
+    if report.tasks or report.sessions:
+        # Once for the whole import rather than per row
+        await rollups.rebuild_user_stats(db, user_id)
+        await refresh_insights(db, user_id, force=True)
+        await versions.bump(db, user_id, "tasks", "pomodoro")
+        await db.commit()
+        # Too many changes to send one by one; clients reload instead
+        await events.publish(user_id, "resync")
+
+    report.seconds = time.perf_counter() - report.started
+    return report
+
+async def _main(args):
+    from database import SessionLocal, engine
+    from models import User
+
+    async with SessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.username == args.user))
+        if user_id is None:
+            raise SystemExit(f"No user named {args.user!r}")
+        with open(args.path, encoding="utf-8", newline="") as text_file:
+            report = await import_rows(
+                db, user_id, read_rows(text_file, args.format, args.resource), args.chunk_size
+            )
+    await engine.dispose()
+
+    result = report.as_dict()
+    for error in result["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    print(
+        f"imported {result['tasks']} tasks and {result['sessions']} sessions, "
+        f"skipped {result['skipped']} rows in {result['seconds']}s "
+        f"({result['rows_per_second']} rows/s)"
+    )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--user", required=True, help="username to import into")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--resource", choices=RESOURCES, help="resource in a CSV file")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.format == "csv" and not args.resource:
+        parser.error("--resource is required for CSV")
+    asyncio.run(_main(args))
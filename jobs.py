@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 1000))
+# Processes mark their active jobs alive this often; a job that misses
+# JOB_LOST_AFTER_HEARTBEATS in a row died with its process (e.g. a restart)
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", 10))
+JOB_LOST_AFTER_HEARTBEATS = 3
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class QueueFull(Exception):
+    pass
+
+def _fail_if_lost(job: BackgroundJob):
+    """Mark an active job whose owner stopped heartbeating as failed; returns whether it was."""
+    if job.status not in ACTIVE_STATUSES:
+        return False
+    heartbeat = job.heartbeat_at
+    if heartbeat is not None:
+        # SQLite returns naive UTC values
+        if heartbeat.tzinfo is None:
+            heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+        lost_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_HEARTBEAT_SECONDS * JOB_LOST_AFTER_HEARTBEATS)
+        if heartbeat >= lost_before:
+            return False
+    job.status = "failed"
+    job.error = "Lost when the process running it stopped"
+    job.finished_at = datetime.now(timezone.utc)
+    return True
+
+def job_to_dict(job: BackgroundJob):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+class JobQueue:
+    """Bounded in-process worker pool for per-user background jobs.
+
+    Job state lives in the ``background_jobs`` table, so any app process can
+    answer status requests and see an active job when deduplicating. A job
+    submitted while another of the same kind is queued or running for that
+    user is coalesced into the existing one, as long as the process that
+    owns it is still heartbeating; otherwise the old job is marked failed.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._submit_lock = asyncio.Lock()
+        self.owner = uuid.uuid4().hex
+
+    def register(self, kind: str, handler):
+        """``handler(db, job)`` runs the job and returns a JSON-able result."""
+        self._handlers[kind] = handler
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still queued or running here would never finish
+        try:
+            async with SessionLocal() as db:
+                await db.execute(update(BackgroundJob).where(
+                    BackgroundJob.owner == self.owner,
+                    BackgroundJob.status.in_(ACTIVE_STATUSES)
+                ).values(status="failed", error="Interrupted by shutdown", finished_at=datetime.now(timezone.utc)))
+                await db.commit()
+        except Exception:
+            logger.exception("Could not mark interrupted jobs as failed")
+
+    async def submit(self, db, kind: str, user_id: int):
+        """Queue a job, or return the user's active one; returns ``(job, created)``."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        async with self._submit_lock:
+            active = (await db.scalars(select(BackgroundJob).where(
+                BackgroundJob.user_id == user_id,
+                BackgroundJob.kind == kind,
+                BackgroundJob.status.in_(ACTIVE_STATUSES)
+            ).order_by(BackgroundJob.created_at.desc()))).all()
+            for existing in active:
+                # Lost jobs are marked failed with the commit below
+                if not _fail_if_lost(existing):
+                    return existing, False
+
+            if self._queue is None or self._queue.full():
+                raise QueueFull("Job queue is full, try again later")
+
+            job = BackgroundJob(
+                id=uuid.uuid4().hex,
+                kind=kind,
+                user_id=user_id,
+                status="queued",
+                owner=self.owner,
+                created_at=datetime.now(timezone.utc),
+                heartbeat_at=datetime.now(timezone.utc)
+            )
+            db.add(job)
+            await db.commit()
+            self._queue.put_nowait(job.id)
+            return job, True
+
+    async def get(self, db, job_id: str, user_id: int):
+        job = await db.scalar(select(BackgroundJob).where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.user_id == user_id
+        ))
+        if job is not None and _fail_if_lost(job):
+            await db.commit()
+        return job
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(update(BackgroundJob).where(
+                        BackgroundJob.owner == self.owner,
+                        BackgroundJob.status.in_(ACTIVE_STATUSES)
+                    ).values(heartbeat_at=datetime.now(timezone.utc)))
+                    await db.commit()
+            except Exception:
+                logger.exception("Could not record job heartbeat")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job %s could not be recorded", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        async with SessionLocal() as db:
+            job = await db.get(BackgroundJob, job_id)
+            if job is None:
+                return
+            job.status = "running"
+            job.started_at = datetime.now(timezone.utc)
+            await db.commit()
+
+            try:
+                result = await self._handlers[job.kind](db, job)
+            except Exception as exc:
+                logger.warning("Job %s (%s) failed: %s", job.id, job.kind, exc)
+                await db.rollback()
+                job.status = "failed"
+                job.error = str(exc) or exc.__class__.__name__
+            else:
+                job.status = "succeeded"
+                job.result = json.dumps(result, default=str)
+            job.finished_at = datetime.now(timezone.utc)
+            db.add(job)
+            await db.commit()
+
+job_queue = JobQueue()
@@ -1,23 +1,45 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import uvicorn
+from fastapi.responses import FileResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
-from database import engine, get_db
-from models import Base
-from routers import auth, tasks, pomodoro, github, insights
-from auth_utils import get_current_user
+from database import dispose_engines, engine, replica_stats, ReadYourWritesMiddleware
+from routers import auth, tasks, pomodoro, github, insights, stream, bootstrap, export, imports
+from auth_utils import get_current_user, get_read_db, principal_cache
+from jobs import job_queue
+from retention import retention_schedule
+from write_behind import session_writes, SESSION_WRITE_BEHIND
+import events
+import metrics
+import migrations
+import rollups
 
 load_dotenv()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# serve.py migrates once before starting workers and turns this off for them
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() not in ("0", "false", "no")
 
-app = FastAPI(title="DevDash API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_AUTO_MIGRATE:
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+    await job_queue.start()
+    await retention_schedule.start()
+    if SESSION_WRITE_BEHIND:
+        await session_writes.start()
+    yield
+    await session_writes.stop()
+    await retention_schedule.stop()
+    await job_queue.stop()
+    await dispose_engines()
+
+app = FastAPI(title="DevDash API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -26,7 +48,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Search-Truncated", "ETag"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+# Outermost, so it times everything below
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -34,61 +60,59 @@ app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(pomodoro.router, prefix="/api/pomodoro", tags=["pomodoro"])
 app.include_router(github.router, prefix="/api/github", tags=["github"])
 app.include_router(insights.router, prefix="/api/insights", tags=["insights"])
+app.include_router(stream.router, prefix="/api", tags=["stream"])
+app.include_router(bootstrap.router, prefix="/api", tags=["bootstrap"])
+app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(imports.router, prefix="/api", tags=["import"])
 
 # Health check
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "principal_cache": principal_cache.stats(),
+        "streams": events.broker.stats(),
+        "replicas": replica_stats(),
+        "session_writes": session_writes.stats(),
+    }
+
+# Prometheus scrape endpoint; set METRICS_TOKEN to require it as a bearer token
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    token = os.getenv("METRICS_TOKEN")
+    if token and authorization != f"Bearer {token}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    cache = principal_cache.stats()
+    streams = events.broker.stats()
+    writes = session_writes.stats()
+    return PlainTextResponse(metrics.render(engine, {
+        "devdash_auth_cache_size": cache["size"],
+        "devdash_auth_cache_hits_total": cache["hits"],
+        "devdash_auth_cache_misses_total": cache["misses"],
+        "devdash_auth_cache_evictions_total": cache["evictions"],
+        "devdash_job_queue_depth": job_queue.depth,
+        "devdash_streams_open": streams["streams"],
+        "devdash_stream_events_published_total": streams["published"],
+        "devdash_stream_events_dropped_total": streams["dropped"],
+        "devdash_session_writes_pending": writes["pending"],
+        "devdash_session_writes_flushed_total": writes["flushed"],
+        "devdash_session_writes_failed_flushes_total": writes["failed_flushes"],
+    }), media_type="text/plain; version=0.0.4")
 
 # Dashboard stats endpoint
 @app.get("/api/dashboard-stats")
-async def get_dashboard_stats(current_user = Depends(get_current_user), db = Depends(get_db)):
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
-    from models import PomodoroSession, Task, GitHubStats
-    
-    today = datetime.now().date()
-    week_ago = today - timedelta(days=7)
-    
-    # Today's focus time
-    today_focus = db.query(func.sum(PomodoroSession.duration)).filter(
-        PomodoroSession.user_id == current_user.id,
-        PomodoroSession.completed == True,
-        func.date(PomodoroSession.started_at) == today
-    ).scalar() or 0
-    
-    # Week's focus time
-    week_focus = db.query(func.sum(PomodoroSession.duration)).filter(
-        PomodoroSession.user_id == current_user.id,
-        PomodoroSession.completed == True,
-        func.date(PomodoroSession.started_at) >= week_ago
-    ).scalar() or 0
-    
-    # Week's completed tasks
-    week_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id,
-        Task.completed == True,
-        func.date(Task.updated_at) >= week_ago
-    ).scalar() or 0
-    
-    # Today's commits (mock data for now)
-    today_commits = 5
-    week_commits = 25
-    
-    return {
-        "todayCommits": today_commits,
-        "todayFocusTime": round(today_focus / 60, 2) if today_focus else 0,
-        "weekCommits": week_commits,
-        "weekFocusTime": round(week_focus / 60, 2) if week_focus else 0,
-        "weekTasks": week_tasks,
-        "streak": 7
-    }
+async def get_dashboard_stats(current_user = Depends(get_current_user), db = Depends(get_read_db)):
+    # Answered from at most eight daily rollup rows, see rollups.py
+    return await rollups.get_dashboard_stats(db, current_user.id)
 
 # Serve static files in production
 if os.getenv("ENVIRONMENT") == "production":
     app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
 if __name__ == "__main__":
+    # Development server; production runs serve.py
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -0,0 +1,219 @@
+"""Request and database metrics, served in Prometheus text format.
+
+``MetricsMiddleware`` times every request by route template; engine and
+session hooks attribute query counts and database time to the request in
+flight, log slow statements and time pool checkouts. Everything is plain
+counters and fixed-bucket histograms kept in process memory, cheap enough
+to leave on. Each worker process reports its own numbers.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from bisect import bisect_left
+from collections import defaultdict
+import contextvars
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Stats of the request the current task is serving
+_current = contextvars.ContextVar("request_stats", default=None)
+
+requests_total = defaultdict(int)          # (method, route, status)
+request_seconds = {}                       # (method, route) -> Histogram
+db_queries_total = defaultdict(int)        # (method, route), empty outside requests
+db_seconds_total = defaultdict(float)
+slow_queries_total = 0
+pool_checkout_seconds = Histogram(CHECKOUT_BUCKETS)
+in_flight = 0
+
+def route_template(scope):
+    """The matched route's path template, e.g. ``/api/tasks/{task_id}``."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    # Routes in included routers may only know their path below the prefix
+    params = scope.get("path_params") or {}
+    try:
+        rendered = route.path_format.format(**{key: str(value) for key, value in params.items()})
+    except (AttributeError, KeyError, IndexError):
+        return path
+    request_path = scope["path"]
+    if request_path.endswith(rendered) and len(request_path) > len(rendered):
+        return request_path[:len(request_path) - len(rendered)] + path
+    return path
+
+class MetricsMiddleware:
+    """Records latency (to the first response byte) and status per route.
+
+    Timing stops at the response start so long-lived streams are measured
+    by how quickly they opened.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        global in_flight
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        latency = None
+
+        async def send_wrapper(message):
+            nonlocal status, latency
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                latency = time.perf_counter() - start
+            await send(message)
+
+        in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight -= 1
+            _current.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
+            requests_total[(method, route, status)] += 1
+            histogram = request_seconds.get((method, route))
+            if histogram is None:
+                histogram = request_seconds[(method, route)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(latency if latency is not None else time.perf_counter() - start)
+            db_queries_total[(method, route)] += stats.queries
+            db_seconds_total[(method, route)] += stats.db_seconds
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global slow_queries_total
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    else:
+        db_queries_total[("", "")] += 1
+        db_seconds_total[("", "")] += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries_total += 1
+        # The statement only; parameters may hold user data
+        logger.warning("Slow query (%.0f ms): %s", elapsed * 1000, " ".join(statement.split())[:2000])
+
+def _after_transaction_create(session, transaction):
+    if transaction.parent is None:
+        session.info["checkout_start"] = time.perf_counter()
+
+def _after_begin(session, transaction, connection):
+    # The connection is taken from the pool between these two events
+    start = session.info.pop("checkout_start", None)
+    if start is not None:
+        pool_checkout_seconds.observe(time.perf_counter() - start)
+
+def instrument(engine):
+    """Attach the query hooks to an ``AsyncEngine``; sessions are covered globally."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(Session, "after_begin", _after_begin):
+        event.listen(Session, "after_transaction_create", _after_transaction_create)
+        event.listen(Session, "after_begin", _after_begin)
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+def _histogram_lines(name, histogram, **labels):
+    prefix = _labels(**labels)
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        yield f'{name}_bucket{{{prefix + "," if prefix else ""}le="{le}"}} {cumulative}'
+    suffix = f"{{{prefix}}}" if prefix else ""
+    yield f"{name}_sum{suffix} {histogram.sum}"
+    yield f"{name}_count{suffix} {histogram.count}"
+
+def render(engine=None, extra: dict = None):
+    """Everything above in Prometheus text format.
+
+    ``extra`` maps further metric names to values, for state owned by other
+    modules; names ending in ``_total`` are counters, the rest gauges.
+    """
+    lines = [
+        "# HELP devdash_http_requests_total Requests by route and status.",
+        "# TYPE devdash_http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(requests_total.items()):
+        lines.append(f"devdash_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+
+    lines += [
+        "# HELP devdash_http_request_duration_seconds Time to the first response byte.",
+        "# TYPE devdash_http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(request_seconds.items()):
+        lines.extend(_histogram_lines("devdash_http_request_duration_seconds", histogram, method=method, route=route))
+
+    lines += [
+        "# HELP devdash_http_requests_in_flight Requests being served.",
+        "# TYPE devdash_http_requests_in_flight gauge",
+        f"devdash_http_requests_in_flight {in_flight}",
+        "# HELP devdash_db_queries_total Queries by the route that ran them (empty outside requests).",
+        "# TYPE devdash_db_queries_total counter",
+    ]
+    for (method, route), count in sorted(db_queries_total.items()):
+        lines.append(f"devdash_db_queries_total{{{_labels(method=method, route=route)}}} {count}")
+    lines += [
+        "# HELP devdash_db_query_seconds_total Time spent in queries by route.",
+        "# TYPE devdash_db_query_seconds_total counter",
+    ]
+    for (method, route), seconds in sorted(db_seconds_total.items()):
+        lines.append(f"devdash_db_query_seconds_total{{{_labels(method=method, route=route)}}} {seconds}")
+    lines += [
+        f"# HELP devdash_db_slow_queries_total Queries slower than {SLOW_QUERY_MS:g} ms.",
+        "# TYPE devdash_db_slow_queries_total counter",
+        f"devdash_db_slow_queries_total {slow_queries_total}",
+        "# HELP devdash_db_pool_checkout_seconds Wait for a pooled connection.",
+        "# TYPE devdash_db_pool_checkout_seconds histogram",
+    ]
+    lines.extend(_histogram_lines("devdash_db_pool_checkout_seconds", pool_checkout_seconds))
+
+    pool = engine.sync_engine.pool if engine is not None else None
+    for name, method in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        if hasattr(pool, method):
+            lines += [f"# TYPE devdash_db_pool_{name} gauge", f"devdash_db_pool_{name} {getattr(pool, method)()}"]
+
+    for name, value in (extra or {}).items():
+        lines += [f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
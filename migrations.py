@@ -0,0 +1,38 @@
+"""Schema migrations, kept as Alembic revisions in alembic/versions.
+
+``alembic upgrade head`` applies them from the command line; the app and
+serve.py call ``upgrade`` on a connection of their own.
+"""
+import os
+from sqlalchemy import inspect, text
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+# The first release's create_all schema; 0002 adds whatever later releases
+# created on the fly, see alembic/versions
+BASELINE_REVISION = "0001"
+# Serializes migrating processes on PostgreSQL
+MIGRATION_LOCK_ID = 4242001
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    return config
+
+def upgrade(connection):
+    """Migrate to the latest revision; pass to ``AsyncConnection.run_sync``.
+
+    Databases created by create_all before migrations existed have tables
+    but no recorded revision. They are stamped at the baseline, and 0002
+    creates the tables, columns and indexes they are missing.
+    """
+    from alembic import command
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    tables = set(inspect(connection).get_table_names())
+    config = alembic_config(connection)
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -23,20 +23,28 @@ class User(Base):
     # Relationships
     tasks = relationship("Task", back_populates="owner")
     pomodoro_sessions = relationship("PomodoroSession", back_populates="owner")
+    session_summaries = relationship("PomodoroMonthlySummary", back_populates="owner")
     github_stats = relationship("GitHubStats", back_populates="owner")
     ai_insights = relationship("AIInsight", back_populates="owner")
+    daily_stats = relationship("DailyUserStats", back_populates="owner")
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination and the common list filters in GET /api/tasks
+        Index("ix_tasks_user_created", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_completed_created", "user_id", "completed", "created_at", "id"),
+        Index("ix_tasks_user_deadline", "user_id", "deadline"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
     priority = Column(String, default="medium")  # low, medium, high
     completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime(timezone=True))
     deadline = Column(DateTime(timezone=True))
     time_spent = Column(Integer, default=0)  # in minutes
-    tags = Column(Text)  # JSON string for tags array
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -44,9 +52,56 @@ class Task(Base):
     # Relationships
     owner = relationship("User", back_populates="tasks")
     pomodoro_sessions = relationship("PomodoroSession", back_populates="task")
+    tag_links = relationship(
+        "TaskTag",
+        back_populates="task",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="TaskTag.position"
+    )
+    
+    @property
+    def tags(self):
+        return [link.name for link in self.tag_links]
+    
+    def set_tags(self, names):
+        existing = {link.name: link for link in self.tag_links}
+        links = []
+        for position, name in enumerate(normalize_tags(names)):
+            link = existing.get(name) or TaskTag(name=name, user_id=self.user_id)
+            link.position = position
+            links.append(link)
+        self.tag_links = links
+
+def normalize_tags(names):
+    seen = []
+    for name in names or []:
+        name = name.strip()
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+class TaskTag(Base):
+    __tablename__ = "task_tags"
+    __table_args__ = (
+        # "tasks tagged X" and per-tag counts for one user
+        Index("ix_task_tags_user_name", "user_id", "name", "task_id"),
+    )
+    
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    position = Column(Integer, default=0, nullable=False)
+    
+    # Relationships
+    task = relationship("Task", back_populates="tag_links")
 
 class PomodoroSession(Base):
     __tablename__ = "pomodoro_sessions"
+    __table_args__ = (
+        Index("ix_pomodoro_sessions_user_started", "user_id", "started_at"),
+        Index("uq_pomodoro_sessions_user_client_ref", "user_id", "client_ref", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     duration = Column(Integer, nullable=False)  # in minutes
@@ -56,13 +111,33 @@ class PomodoroSession(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
+    client_ref = Column(String(64))  # per-user client idempotency key, makes buffered creates safe to replay
     
     # Relationships
     owner = relationship("User", back_populates="pomodoro_sessions")
     task = relationship("Task", back_populates="pomodoro_sessions")
 
+class PomodoroMonthlySummary(Base):
+    __tablename__ = "pomodoro_monthly_summaries"
+    __table_args__ = (UniqueConstraint("user_id", "month", name="uq_pomodoro_monthly_summaries_user_month"),)
+    
+    # Sessions older than the retention period, compacted by retention.py
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month
+    sessions = Column(Integer, default=0, nullable=False)
+    work_sessions = Column(Integer, default=0, nullable=False)
+    completed_work_sessions = Column(Integer, default=0, nullable=False)
+    work_by_hour = Column(Text, nullable=False)  # JSON: work sessions started per weekday * 24 + hour, Monday first
+    focus_by_day = Column(Text, nullable=False)  # JSON: {"YYYY-MM-DD": [focus minutes, completed sessions]}
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    owner = relationship("User", back_populates="session_summaries")
+
 class GitHubStats(Base):
     __tablename__ = "github_stats"
+    __table_args__ = (Index("uq_github_stats_user_date", "user_id", "date", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime(timezone=True), nullable=False)
@@ -80,6 +155,7 @@ class GitHubStats(Base):
 
 class AIInsight(Base):
     __tablename__ = "ai_insights"
+    __table_args__ = (Index("uq_ai_insights_user_type", "user_id", "type", unique=True),)
     
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String, nullable=False)  # peak_hours, focus_trend, break_reminder
@@ -91,4 +167,56 @@ class AIInsight(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    owner = relationship("User", back_populates="ai_insights")
\ No newline at end of file
+    owner = relationship("User", back_populates="ai_insights")
+
+class DailyUserStats(Base):
+    __tablename__ = "daily_user_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_daily_user_stats_user_day"),
+        Index("ix_daily_user_stats_user_updated", "user_id", "updated_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    focus_minutes = Column(Integer, default=0, nullable=False)
+    completed_sessions = Column(Integer, default=0, nullable=False)
+    completed_tasks = Column(Integer, default=0, nullable=False)
+    commits = Column(Integer, default=0, nullable=False)
+    streak = Column(Integer, default=0, nullable=False)  # consecutive active days ending on this day
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    owner = relationship("User", back_populates="daily_stats")
+
+class InsightWatermark(Base):
+    __tablename__ = "insight_watermarks"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # ResourceVersion counters of what the insights were built from
+    pomodoro_version = Column(Integer)
+    github_version = Column(Integer)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    __table_args__ = (Index("ix_background_jobs_user_kind_status", "user_id", "kind", "status"),)
+    
+    id = Column(String(32), primary_key=True)
+    kind = Column(String, nullable=False)  # github_sync
+    status = Column(String, default="queued", nullable=False)  # queued, running, succeeded, failed
+    result = Column(Text)  # JSON string
+    error = Column(Text)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    owner = Column(String(32))  # JobQueue.owner of the process running it
+    heartbeat_at = Column(DateTime(timezone=True))
+
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    resource = Column(String(32), primary_key=True)  # tasks, pomodoro, github, insights
+    version = Column(Integer, default=0, nullable=False)  # bumped on every write, see versions.py
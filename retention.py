@@ -0,0 +1,240 @@
+"""Retention: compact old Pomodoro sessions and prune stale insights.
+
+Sessions older than ``SESSION_RETENTION_DAYS`` are folded into one
+``PomodoroMonthlySummary`` row per user and month, keeping what analytics
+and the rollup rebuild need (work sessions per hour of the week, completed
+minutes and sessions per day), and then deleted. Insights not regenerated
+within ``INSIGHT_RETENTION_DAYS`` are deleted. Work is done in batches of
+``RETENTION_BATCH_SIZE`` rows, each its own short transaction. Runs from
+the command line, or every ``RETENTION_INTERVAL_HOURS`` inside the app:
+
+    python retention.py
+    python retention.py --session-days 180 --dry-run
+"""
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import logging
+import os
+
+from database import SessionLocal, insert_ignore
+from models import AIInsight, InsightWatermark, PomodoroMonthlySummary, PomodoroSession
+import versions
+import events
+
+logger = logging.getLogger(__name__)
+
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", 365))
+INSIGHT_RETENTION_DAYS = int(os.getenv("INSIGHT_RETENTION_DAYS", 90))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))
+# 0 leaves retention to the CLI (e.g. from cron)
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", 0))
+
+# Focus trends, recent completion rates and break reminders read raw sessions
+# from the last five weeks or so; keep comfortably more than that.
+MIN_SESSION_RETENTION_DAYS = 60
+
+SUMMARY_COLUMNS = (
+    PomodoroSession.started_at, PomodoroSession.duration, PomodoroSession.completed, PomodoroSession.session_type
+)
+
+def summarize(sessions):
+    """Fold ``(started_at, duration, completed, session_type)`` rows into per-month counters."""
+    months = {}
+    for started_at, duration, completed, session_type in sessions:
+        month = months.setdefault(started_at.date().replace(day=1), {
+            "sessions": 0, "work_sessions": 0, "completed_work_sessions": 0,
+            "work_by_hour": [0] * 168, "focus_by_day": defaultdict(lambda: [0, 0]),
+        })
+        month["sessions"] += 1
+        if session_type != "break":
+            month["work_sessions"] += 1
+            month["work_by_hour"][started_at.weekday() * 24 + started_at.hour] += 1
+            if completed:
+                month["completed_work_sessions"] += 1
+        if completed:
+            # Any completed session counts as focus time, as in rollups.session_contribution
+            day = month["focus_by_day"][started_at.date().isoformat()]
+            day[0] += duration or 0
+            day[1] += 1
+    return months
+
+async def _merge_summary(db: AsyncSession, user_id: int, month, counters: dict):
+    query = select(PomodoroMonthlySummary).where(
+        PomodoroMonthlySummary.user_id == user_id,
+        PomodoroMonthlySummary.month == month
+    ).with_for_update()
+    await insert_ignore(db, PomodoroMonthlySummary, [{
+        "user_id": user_id, "month": month, "sessions": 0, "work_sessions": 0, "completed_work_sessions": 0,
+        "work_by_hour": json.dumps([0] * 168), "focus_by_day": "{}",
+    }], index_elements=["user_id", "month"])
+    summary = await db.scalar(query)
+
+    summary.sessions += counters["sessions"]
+    summary.work_sessions += counters["work_sessions"]
+    summary.completed_work_sessions += counters["completed_work_sessions"]
+    summary.work_by_hour = json.dumps([
+        total + added for total, added in zip(json.loads(summary.work_by_hour), counters["work_by_hour"])
+    ])
+    focus_by_day = json.loads(summary.focus_by_day)
+    for day, (minutes, count) in counters["focus_by_day"].items():
+        current = focus_by_day.setdefault(day, [0, 0])
+        current[0] += minutes
+        current[1] += count
+    summary.focus_by_day = json.dumps(focus_by_day, sort_keys=True)
+
+async def compact_sessions(db: AsyncSession, user_id: int, before: datetime, batch_size: int = RETENTION_BATCH_SIZE):
+    """Move a user's sessions started before ``before`` into monthly summaries.
+
+    Commits after every batch. Sessions are deleted first and only the rows
+    this transaction actually deleted are summarized, so overlapping runs
+    never count a session twice. Returns the number of sessions compacted.
+    """
+    compacted = 0
+    while True:
+        ids = (await db.scalars(select(PomodoroSession.id).where(
+            PomodoroSession.user_id == user_id,
+            PomodoroSession.started_at < before
+        ).order_by(PomodoroSession.id).limit(batch_size))).all()
+        if not ids:
+            break
+
+        deleted = (await db.execute(
+            delete(PomodoroSession).where(PomodoroSession.id.in_(ids)).returning(*SUMMARY_COLUMNS),
+            execution_options={"synchronize_session": False}
+        )).all()
+        for month, counters in sorted(summarize(deleted).items()):
+            await _merge_summary(db, user_id, month, counters)
+        await versions.bump(db, user_id, "pomodoro")
+        await db.commit()
+        compacted += len(deleted)
+    return compacted
+
+async def prune_insights(db: AsyncSession, before: datetime, batch_size: int = RETENTION_BATCH_SIZE):
+    """Delete insights last generated before ``before``.
+
+    Returns the number deleted and the ids of the users they belonged to.
+
+    Insights are replaced in place on every refresh (one row per type), so
+    an old row means its user has not generated insights since. Their
+    watermark is dropped too, so the next refresh rebuilds them.
+    """
+    deleted, users = 0, set()
+    while True:
+        ids = (await db.scalars(select(AIInsight.id).where(
+            AIInsight.created_at < before
+        ).order_by(AIInsight.id).limit(batch_size))).all()
+        if not ids:
+            break
+        owners = (await db.scalars(
+            delete(AIInsight).where(AIInsight.id.in_(ids)).returning(AIInsight.user_id),
+            execution_options={"synchronize_session": False}
+        )).all()
+        user_ids = set(owners)
+        await db.execute(delete(InsightWatermark).where(InsightWatermark.user_id.in_(user_ids)))
+        for user_id in user_ids:
+            await versions.bump(db, user_id, "insights")
+        await db.commit()
+        deleted += len(owners)
+        users |= user_ids
+    return deleted, users
+
+async def run_retention(
+    db: AsyncSession,
+    session_days: int = SESSION_RETENTION_DAYS,
+    insight_days: int = INSIGHT_RETENTION_DAYS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    dry_run: bool = False,
+):
+    """Compact every user's old sessions and prune stale insights; returns counts."""
+    if session_days < MIN_SESSION_RETENTION_DAYS:
+        raise ValueError(f"Sessions must be kept for at least {MIN_SESSION_RETENTION_DAYS} days")
+    now = datetime.now(timezone.utc)
+    session_cutoff = now - timedelta(days=session_days)
+    insight_cutoff = now - timedelta(days=insight_days)
+
+    if dry_run:
+        sessions = await db.scalar(select(func.count(PomodoroSession.id)).where(
+            PomodoroSession.started_at < session_cutoff
+        ))
+        insights = await db.scalar(select(func.count(AIInsight.id)).where(AIInsight.created_at < insight_cutoff))
+        return {"sessions": sessions, "insights": insights, "users": None}
+
+    user_ids = (await db.scalars(select(PomodoroSession.user_id).where(
+        PomodoroSession.started_at < session_cutoff
+    ).distinct())).all()
+    sessions = 0
+    for user_id in user_ids:
+        sessions += await compact_sessions(db, user_id, session_cutoff, batch_size)
+        # Old sessions disappear from lists; clients reload rather than patch
+        await events.publish(user_id, "resync")
+
+    insights, insight_users = await prune_insights(db, insight_cutoff, batch_size)
+    for user_id in insight_users:
+        await events.publish(user_id, "insights.updated", count=0)
+    return {"sessions": sessions, "insights": insights, "users": len(set(user_ids) | insight_users)}
+
+class RetentionSchedule:
+    """Runs ``run_retention`` every ``interval_hours`` inside the app process.
+
+    Every worker that enables it runs its own schedule; overlapping runs are
+    safe, see ``compact_sessions``.
+    """
+
+    def __init__(self, interval_hours: float = RETENTION_INTERVAL_HOURS):
+        self.interval_hours = interval_hours
+        self._task = None
+
+    async def start(self):
+        if self.interval_hours > 0:
+            self._task = asyncio.create_task(self._loop(), name="retention")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_hours * 3600)
+            try:
+                async with SessionLocal() as db:
+                    result = await run_retention(db)
+                logger.info("Retention compacted %(sessions)s sessions and deleted %(insights)s insights", result)
+            except Exception:
+                logger.exception("Retention run failed")
+
+retention_schedule = RetentionSchedule()
+
+async def _main(args):
+    from database import engine
+
+    async with SessionLocal() as db:
+        result = await run_retention(db, args.session_days, args.insight_days, args.batch_size, args.dry_run)
+    await engine.dispose()
+
+    if args.dry_run:
+        print(f"would compact {result['sessions']} sessions and delete {result['insights']} insights")
+    else:
+        print(
+            f"compacted {result['sessions']} sessions and deleted {result['insights']} insights "
+            f"of {result['users']} users"
+        )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--session-days", type=int, default=SESSION_RETENTION_DAYS, help="keep sessions this recent")
+    parser.add_argument("--insight-days", type=int, default=INSIGHT_RETENTION_DAYS, help="keep insights this recent")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count what would be removed")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except ValueError as exc:
+        parser.error(str(exc))
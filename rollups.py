@@ -0,0 +1,272 @@
+from datetime import date, datetime, timedelta, timezone
+import json
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import insert_ignore
+from models import DailyUserStats, PomodoroMonthlySummary, PomodoroSession, Task, GitHubStats, User
+
+# Per-user, per-day counters behind /api/dashboard-stats. Writers report what a
+# row contributed before and after a change; the rollup applies the difference.
+COUNTERS = ("focus_minutes", "completed_sessions", "completed_tasks", "commits")
+
+def utc_today():
+    """Today in UTC, the clock stored timestamps use; rollup days are UTC days."""
+    return datetime.now(timezone.utc).date()
+
+def _day(value):
+    if value is None:
+        return utc_today()
+    if isinstance(value, datetime):
+        # Naive values come back from SQLite and are already UTC
+        return (value.astimezone(timezone.utc) if value.tzinfo else value).date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+def _is_active(row):
+    return bool(row.focus_minutes or row.completed_tasks or row.commits)
+
+async def _get_row(db: AsyncSession, user_id: int, day: date, create: bool = True):
+    query = select(DailyUserStats).where(
+        DailyUserStats.user_id == user_id,
+        DailyUserStats.day == day
+    )
+    row = await db.scalar(query)
+    if row is None and create:
+        # Concurrent first writes of the day both get here; only one insert lands
+        await insert_ignore(db, DailyUserStats, [
+            {"user_id": user_id, "day": day, "streak": 0, **{field: 0 for field in COUNTERS}}
+        ], index_elements=["user_id", "day"])
+        row = await db.scalar(query)
+    return row
+
+async def _refresh_streak(db: AsyncSession, row: DailyUserStats):
+    previous = await _get_row(db, row.user_id, row.day - timedelta(days=1), create=False)
+    streak = (previous.streak if previous else 0) + 1 if _is_active(row) else 0
+    if row.streak == streak:
+        return
+    row.streak = streak
+
+    # Later days only exist when history is backfilled (e.g. a GitHub sync),
+    # so this walk is short in practice.
+    following = (await db.scalars(select(DailyUserStats).where(
+        DailyUserStats.user_id == row.user_id,
+        DailyUserStats.day > row.day
+    ).order_by(DailyUserStats.day))).all()
+
+    expected_day, streak = row.day, row.streak
+    for later in following:
+        expected_day += timedelta(days=1)
+        if later.day != expected_day or not _is_active(later):
+            break
+        streak += 1
+        later.streak = streak
+
+async def _apply(db: AsyncSession, user_id: int, day: date, deltas: dict):
+    row = await _get_row(db, user_id, day)
+    # Added in SQL, so concurrent writers to the same day do not overwrite each other
+    values = {}
+    for field, delta in deltas.items():
+        column = getattr(DailyUserStats, field)
+        values[field] = case((column + delta < 0, 0), else_=column + delta)
+    row = (await db.scalars(
+        update(DailyUserStats).where(DailyUserStats.id == row.id).values(**values).returning(DailyUserStats),
+        execution_options={"populate_existing": True, "synchronize_session": False}
+    )).one()
+    # The streak follows from the stored counters, whoever else changed them
+    await _refresh_streak(db, row)
+    return row
+
+def session_contribution(session: PomodoroSession):
+    if not session.completed:
+        return None
+    return _day(session.started_at), {"focus_minutes": session.duration or 0, "completed_sessions": 1}
+
+def task_contribution(task: Task):
+    if not task.completed:
+        return None
+    return _day(task.completed_at or task.updated_at), {"completed_tasks": 1}
+
+async def apply_change(db: AsyncSession, user_id: int, before, after):
+    """Move a row's contribution from ``before`` to ``after``.
+
+    Both are ``(day, counters)`` pairs as returned by ``session_contribution``
+    and ``task_contribution``, or ``None`` when the row does not count.
+    Returns whether the rollup changed.
+    """
+    if before == after:
+        return False
+    if before:
+        day, counters = before
+        await _apply(db, user_id, day, {field: -value for field, value in counters.items()})
+    if after:
+        day, counters = after
+        await _apply(db, user_id, day, counters)
+    return True
+
+async def apply_changes(db: AsyncSession, user_id: int, changes):
+    """Apply many ``(before, after)`` pairs, touching each day's row once.
+
+    Returns whether the rollup changed.
+    """
+    deltas = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for sign, contribution in ((-1, before), (1, after)):
+            if contribution:
+                day, counters = contribution
+                day_deltas = deltas.setdefault(day, {})
+                for field, value in counters.items():
+                    day_deltas[field] = day_deltas.get(field, 0) + sign * value
+
+    changed = False
+    for day in sorted(deltas):
+        if any(deltas[day].values()):
+            await _apply(db, user_id, day, deltas[day])
+            changed = True
+    return changed
+
+async def set_commits_bulk(db: AsyncSession, user_id: int, commits_by_day: dict):
+    """Apply a window of daily commit counts with one read.
+
+    Streaks are recomputed from the first day of the window onwards.
+    """
+    if not commits_by_day:
+        return
+    commits_by_day = {_day(day): commits for day, commits in commits_by_day.items()}
+    start = min(commits_by_day)
+
+    rows = {row.day: row for row in (await db.scalars(select(DailyUserStats).where(
+        DailyUserStats.user_id == user_id,
+        DailyUserStats.day >= start - timedelta(days=1)
+    ))).all()}
+
+    for day, commits in commits_by_day.items():
+        row = rows.get(day)
+        if row is None:
+            if not commits:
+                continue
+            row = DailyUserStats(user_id=user_id, day=day, streak=0, **{field: 0 for field in COUNTERS})
+            db.add(row)
+            rows[day] = row
+        row.commits = commits
+
+    previous = rows.get(start - timedelta(days=1))
+    previous_day, streak = (previous.day, previous.streak) if previous else (None, 0)
+    for day in sorted(day for day in rows if day >= start):
+        row = rows[day]
+        if _is_active(row):
+            consecutive = previous_day is not None and day - previous_day == timedelta(days=1)
+            streak = streak + 1 if consecutive else 1
+        else:
+            streak = 0
+        row.streak = streak
+        previous_day = day
+    await db.flush()
+
+async def get_dashboard_stats(db: AsyncSession, user_id: int, today: date = None):
+    today = today or utc_today()
+    week_ago = today - timedelta(days=7)
+
+    rows = (await db.scalars(select(DailyUserStats).where(
+        DailyUserStats.user_id == user_id,
+        DailyUserStats.day >= week_ago,
+        DailyUserStats.day <= today
+    ))).all()
+    by_day = {row.day: row for row in rows}
+
+    today_row = by_day.get(today)
+    yesterday_row = by_day.get(today - timedelta(days=1))
+    if today_row and _is_active(today_row):
+        streak = today_row.streak
+    else:
+        # Today's streak is still open until the day is over
+        streak = yesterday_row.streak if yesterday_row else 0
+
+    today_focus = today_row.focus_minutes if today_row else 0
+    week_focus = sum(row.focus_minutes for row in rows)
+
+    return {
+        "todayCommits": today_row.commits if today_row else 0,
+        "todayFocusTime": round(today_focus / 60, 2) if today_focus else 0,
+        "weekCommits": sum(row.commits for row in rows),
+        "weekFocusTime": round(week_focus / 60, 2) if week_focus else 0,
+        "weekTasks": sum(row.completed_tasks for row in rows),
+        "streak": streak
+    }
+
+async def rebuild_user_stats(db: AsyncSession, user_id: int):
+    """Recompute a user's rollup rows from the source tables.
+
+    Used to backfill history written before the rollup existed; the
+    request path only ever applies incremental changes.
+    """
+    totals = {}
+
+    def add(day, field, value):
+        counters = totals.setdefault(_day(day), {name: 0 for name in COUNTERS})
+        counters[field] += value or 0
+
+    session_day = func.date(PomodoroSession.started_at)
+    for day, minutes, count in await db.execute(select(
+        session_day, func.sum(PomodoroSession.duration), func.count(PomodoroSession.id)
+    ).where(
+        PomodoroSession.user_id == user_id,
+        PomodoroSession.completed == True
+    ).group_by(session_day)):
+        add(day, "focus_minutes", minutes)
+        add(day, "completed_sessions", count)
+
+    # Sessions compacted by retention.py keep their daily totals here
+    for focus_by_day in await db.scalars(select(PomodoroMonthlySummary.focus_by_day).where(
+        PomodoroMonthlySummary.user_id == user_id
+    )):
+        for day, (minutes, count) in json.loads(focus_by_day).items():
+            add(day, "focus_minutes", minutes)
+            add(day, "completed_sessions", count)
+
+    task_day = func.date(func.coalesce(Task.completed_at, Task.updated_at))
+    for day, count in await db.execute(select(task_day, func.count(Task.id)).where(
+        Task.user_id == user_id,
+        Task.completed == True
+    ).group_by(task_day)):
+        add(day, "completed_tasks", count)
+
+    stats_day = func.date(GitHubStats.date)
+    for day, commits in await db.execute(select(stats_day, func.sum(GitHubStats.commits)).where(
+        GitHubStats.user_id == user_id
+    ).group_by(stats_day)):
+        add(day, "commits", commits)
+
+    await db.execute(delete(DailyUserStats).where(DailyUserStats.user_id == user_id))
+
+    previous_day, streak = None, 0
+    for day in sorted(totals):
+        counters = totals[day]
+        row = DailyUserStats(user_id=user_id, day=day, streak=0, **counters)
+        if _is_active(row):
+            consecutive = previous_day is not None and day - previous_day == timedelta(days=1)
+            streak = streak + 1 if consecutive else 1
+            row.streak = streak
+        else:
+            streak = 0
+        previous_day = day
+        db.add(row)
+
+    return len(totals)
+
+async def _rebuild_all():
+    from database import SessionLocal
+
+    async with SessionLocal() as db:
+        for user_id in (await db.scalars(select(User.id))).all():
+            days = await rebuild_user_stats(db, user_id)
+            await db.commit()
+            print(f"user {user_id}: rebuilt {days} days")
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(_rebuild_all())
@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from typing import Optional
 from datetime import timedelta
 
 from database import get_db
 from models import User
 from auth_utils import (
-    verify_password, 
-    get_password_hash, 
+    hash_password_async,
+    verify_and_update_password_async,
     create_access_token, 
     get_current_user,
+    Principal,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
@@ -20,30 +23,35 @@ class UserCreate(BaseModel):
     username: str
     email: str
     password: str
-    full_name: str = None
+    full_name: Optional[str] = None
+
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    github_username: Optional[str] = None
+    github_access_token: Optional[str] = None
 
 class UserResponse(BaseModel):
     id: int
     username: str
     email: str
-    full_name: str = None
-    github_username: str = None
+    full_name: Optional[str] = None
+    github_username: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await db.scalar(select(User).where(User.username == user.username))
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -51,7 +59,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -59,22 +67,31 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    
+    valid, new_hash = False, None
+    if user and user.hashed_password:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade hashes made with an older bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -82,6 +99,28 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+async def _get_user_record(db: AsyncSession, principal: Principal):
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await _get_user_record(db, current_user)
+
+@router.put("/me", response_model=UserResponse)
+async def update_users_me(
+    user_update: UserUpdate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await _get_user_record(db, current_user)
+    
+    update_data = user_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(user, field, value)
+    
+    await db.commit()
+    await db.refresh(user)
+    return user
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import List, Optional
+
+from models import User
+from auth_utils import get_current_user, get_read_db, Principal
+from routers.auth import UserResponse
+from routers.tasks import TaskResponse, fetch_tasks
+from routers.pomodoro import PomodoroResponse, fetch_sessions
+from routers.github import GitHubStatsResponse, fetch_github_stats
+from routers.insights import InsightResponse, fetch_insights
+import rollups
+from serialization import json_response
+
+router = APIRouter()
+
+SECTIONS = ("user", "stats", "tasks", "sessions", "github_stats", "insights")
+
+class BootstrapResponse(BaseModel):
+    user: Optional[UserResponse] = None
+    stats: Optional[dict] = None
+    tasks: Optional[List[TaskResponse]] = None
+    tasks_next_cursor: Optional[str] = None
+    sessions: Optional[List[PomodoroResponse]] = None
+    github_stats: Optional[List[GitHubStatsResponse]] = None
+    insights: Optional[List[InsightResponse]] = None
+
+@router.get("/bootstrap", response_model=BootstrapResponse)
+async def bootstrap(
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Everything the dashboard needs for first paint in one request.
+
+    ``fields`` is a comma-separated subset of the sections (all by default).
+    The sections share one session and so one pooled connection; a single
+    connection runs one statement at a time, so they are queried in turn.
+    """
+    wanted = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(SECTIONS)
+    unknown = sorted(set(wanted) - set(SECTIONS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    result = {}
+    if "user" in wanted:
+        user = await db.get(User, current_user.id)
+        result["user"] = UserResponse.model_validate(user, from_attributes=True).model_dump(mode="json")
+    if "stats" in wanted:
+        result["stats"] = await rollups.get_dashboard_stats(db, current_user.id)
+    if "tasks" in wanted:
+        result["tasks"], result["tasks_next_cursor"] = await fetch_tasks(db, current_user.id)
+    if "sessions" in wanted:
+        result["sessions"] = await fetch_sessions(db, current_user.id)
+    if "github_stats" in wanted:
+        result["github_stats"] = await fetch_github_stats(db, current_user.id)
+    if "insights" in wanted:
+        result["insights"] = await fetch_insights(db, current_user.id)
+
+    # Every section is already shaped like its response model
+    return json_response(result)
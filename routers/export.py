@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from typing import Literal, Optional
+from datetime import date, datetime
+import csv
+import io
+
+from database import SessionLocal, read_session, wrote_recently
+from models import AIInsight, GitHubStats, PomodoroSession, Task
+from auth_utils import authenticate, security
+from routers.tasks import TASK_COLUMNS, fetch_tags
+from routers.pomodoro import SESSION_COLUMNS
+from routers.github import GITHUB_STATS_COLUMNS
+from routers.insights import INSIGHT_COLUMNS
+from serialization import dumps, loads_list
+
+router = APIRouter()
+
+EXPORT_BATCH_SIZE = 1000
+
+# Exported in this order, each by ascending id
+EXPORTS = {
+    "tasks": (Task, TASK_COLUMNS + (Task.completed_at,)),
+    "sessions": (PomodoroSession, SESSION_COLUMNS),
+    "github_stats": (GitHubStats, GITHUB_STATS_COLUMNS),
+    "insights": (AIInsight, INSIGHT_COLUMNS),
+}
+
+def parse_cursor(cursor: str):
+    resource, _, last_id = cursor.partition(":")
+    if resource not in EXPORTS or not last_id.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected <resource>:<id>")
+    return resource, int(last_id)
+
+def column_names(resource: str):
+    names = [column.key for column in EXPORTS[resource][1]]
+    return names + ["tags"] if resource == "tasks" else names
+
+def csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(value)
+    return value
+
+async def export_rows(db, user_id: int, resource: str, after_id: int = 0):
+    """Yield lists of row dicts for one resource, read through a streamed cursor."""
+    model, columns = EXPORTS[resource]
+    result = await db.stream(
+        select(*columns).where(model.user_id == user_id, model.id > after_id).order_by(model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        rows = [row._asdict() for row in partition]
+        if resource == "tasks":
+            tags = await fetch_tags(db, [row["id"] for row in rows])
+            for row in rows:
+                row["tags"] = tags.get(row["id"], [])
+        elif resource == "github_stats":
+            for row in rows:
+                row["repositories"] = loads_list(row["repositories"])
+        yield rows
+
+@router.get("/export")
+async def export_data(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    resources: Optional[str] = None,
+    cursor: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Stream the user's tasks, sessions, GitHub stats and insights.
+
+    ``resources`` picks a comma-separated subset; CSV takes exactly one.
+    Every row carries its ``id``. To resume an interrupted export, pass
+    ``cursor=<resource>:<id>`` from the last row received. NDJSON rows are
+    tagged with ``resource`` and the stream ends with a ``complete`` line.
+    """
+    wanted = [name.strip() for name in resources.split(",") if name.strip()] if resources else list(EXPORTS)
+    unknown = sorted(set(wanted) - set(EXPORTS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown resources: {', '.join(unknown)}")
+    if format == "csv" and len(wanted) != 1:
+        raise HTTPException(status_code=400, detail="CSV exports one resource at a time")
+    wanted = [name for name in EXPORTS if name in wanted]
+
+    after = {}
+    if cursor:
+        resource, last_id = parse_cursor(cursor)
+        if resource not in wanted:
+            raise HTTPException(status_code=400, detail="Cursor resource is not being exported")
+        # Resources before the cursor's one were already delivered
+        wanted = wanted[wanted.index(resource):]
+        after[resource] = last_id
+
+    # The stream opens its own session below; this one only authenticates
+    async with SessionLocal() as db:
+        principal = await authenticate(credentials.credentials, db)
+    primary = wrote_recently(request.cookies)
+
+    async def ndjson():
+        count = 0
+        async with read_session(primary) as db:
+            for resource in wanted:
+                async for rows in export_rows(db, principal.id, resource, after.get(resource, 0)):
+                    count += len(rows)
+                    yield b"".join(dumps({"resource": resource, **row}) + b"\n" for row in rows)
+        yield dumps({"complete": True, "rows": count}) + b"\n"
+
+    async def csv_rows():
+        resource = wanted[0]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # Resumed exports append to an existing file
+        if not cursor:
+            writer.writerow(column_names(resource))
+        async with read_session(primary) as db:
+            async for rows in export_rows(db, principal.id, resource, after.get(resource, 0)):
+                for row in rows:
+                    writer.writerow([csv_value(value) for value in row.values()])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    if format == "csv":
+        filename = f"devdash-{wanted[0]}.csv"
+        return StreamingResponse(csv_rows(), media_type="text/csv", headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        })
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers={
+        "Content-Disposition": 'attachment; filename="devdash-export.ndjson"'
+    })
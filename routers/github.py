@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime, date
-import json
+from typing import List, Literal, Optional, Union
+from datetime import datetime, date, timedelta
+import math
 
-from database import get_db
+from database import get_db, note_write
 from models import GitHubStats, User
-from auth_utils import get_current_user
+from auth_utils import get_current_user, get_read_db, Principal
+from jobs import job_queue, job_to_dict, QueueFull
+import versions
+import events
+from serialization import json_response, loads_list, rows_to_dicts
 
 router = APIRouter()
 
+GITHUB_STATS_COLUMNS = (
+    GitHubStats.id, GitHubStats.date, GitHubStats.commits, GitHubStats.lines_added, GitHubStats.lines_removed,
+    GitHubStats.pull_requests, GitHubStats.issues, GitHubStats.repositories
+)
+
 class GitHubStatsResponse(BaseModel):
     id: int
     date: datetime
@@ -24,70 +34,150 @@ class GitHubStatsResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/stats", response_model=List[GitHubStatsResponse])
+class GitHubStatsBucket(BaseModel):
+    date: datetime  # start of the bucket
+    days: int  # daily rows summed into the bucket
+    commits: int
+    lines_added: int
+    lines_removed: int
+    pull_requests: int
+    issues: int
+
+BUCKET_COUNTERS = ("commits", "lines_added", "lines_removed", "pull_requests", "issues")
+
+@router.get("/stats", response_model=Union[List[GitHubStatsResponse], List[GitHubStatsBucket]])
 async def get_github_stats(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    bucket: Literal["day", "week", "month"] = "day",
+    max_points: Optional[int] = Query(None, ge=1),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(GitHubStats).filter(GitHubStats.user_id == current_user.id)
+    """Daily rows, newest first, or totals per ``bucket`` for charts.
+
+    With ``bucket=week|month`` or ``max_points`` the rows are summed in SQL
+    per calendar bucket; ``max_points`` then merges neighbouring buckets
+    until no more than that many remain.
+    """
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "github")
+    if unchanged:
+        return unchanged
     
+    if bucket == "day" and max_points is None:
+        return json_response(await fetch_github_stats(db, current_user.id, start_date, end_date), response)
+    
+    buckets = await fetch_github_buckets(db, current_user.id, bucket, start_date, end_date)
+    return json_response(downsample(buckets, max_points), response)
+
+def _in_range(query, start_date: Optional[date], end_date: Optional[date]):
     if start_date:
-        query = query.filter(GitHubStats.date >= start_date)
+        query = query.where(GitHubStats.date >= start_date)
     if end_date:
-        query = query.filter(GitHubStats.date <= end_date)
+        # Rows are stamped at midnight; include the whole end day
+        query = query.where(GitHubStats.date < end_date + timedelta(days=1))
+    return query
+
+async def fetch_github_stats(db: AsyncSession, user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    query = select(*GITHUB_STATS_COLUMNS).where(GitHubStats.user_id == user_id)
     
-    stats = query.order_by(GitHubStats.date.desc()).all()
+    query = _in_range(query, start_date, end_date)
     
-    # Parse repositories from JSON string
+    stats = rows_to_dicts(await db.execute(query.order_by(GitHubStats.date.desc())))
+    
+    # Repositories are stored as a JSON string
     for stat in stats:
-        if stat.repositories:
-            try:
-                stat.repositories = json.loads(stat.repositories)
-            except:
-                stat.repositories = []
-        else:
-            stat.repositories = []
+        stat["repositories"] = loads_list(stat["repositories"])
     
     return stats
 
-@router.post("/sync")
+def _bucket_start(db: AsyncSession, bucket: str):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(bucket, GitHubStats.date)
+    # SQLite: weeks start on Monday like date_trunc('week')
+    if bucket == "week":
+        return func.date(GitHubStats.date, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", GitHubStats.date)
+    return func.date(GitHubStats.date)
+
+async def fetch_github_buckets(db: AsyncSession, user_id: int, bucket: str, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Per-bucket totals, newest first, grouped in SQL; served by the (user_id, date) index."""
+    start = _bucket_start(db, bucket).label("bucket")
+    query = select(
+        start,
+        func.count(GitHubStats.id).label("days"),
+        *(func.coalesce(func.sum(getattr(GitHubStats, field)), 0).label(field) for field in BUCKET_COUNTERS)
+    ).where(GitHubStats.user_id == user_id)
+    
+    query = _in_range(query, start_date, end_date)
+    
+    buckets = rows_to_dicts(await db.execute(query.group_by(start).order_by(start.desc())))
+    for row in buckets:
+        # SQLite hands back date strings
+        value = row.pop("bucket")
+        row["date"] = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return buckets
+
+def downsample(buckets: list, max_points: Optional[int]):
+    """Merge runs of neighbouring buckets (newest first) into at most ``max_points``."""
+    if not max_points or len(buckets) <= max_points:
+        return buckets
+    size = math.ceil(len(buckets) / max_points)
+    merged = []
+    for offset in range(0, len(buckets), size):
+        group = buckets[offset:offset + size]
+        point = {"date": group[-1]["date"], "days": sum(row["days"] for row in group)}
+        for field in BUCKET_COUNTERS:
+            point[field] = sum(row[field] for row in group)
+        merged.append(point)
+    return merged
+
+async def run_github_sync(db: AsyncSession, job):
+    # Loaded with httpx on the first sync rather than at startup
+    import github_sync
+
+    user = await db.get(User, job.user_id)
+    result = await github_sync.sync_user(db, user)
+    await events.publish(user.id, "github.synced", **result)
+    await events.publish_stats(db, user.id)
+    return result
+
+job_queue.register("github_sync", run_github_sync)
+
+@router.post("/sync", status_code=202)
 async def sync_github_data(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    """Queue a sync of the user's GitHub activity.
+
+    Returns immediately; poll ``GET /api/github/sync/{job_id}`` for the
+    outcome. A sync already queued or running for the user is reused.
     """
-    This endpoint would normally fetch data from GitHub API
-    For now, it creates sample data
-    """
-    from datetime import timedelta
-    import random
+    user = await db.get(User, current_user.id)
+    if not user.github_username:
+        raise HTTPException(status_code=400, detail="Link a GitHub account first (PUT /api/auth/me)")
     
-    # Generate sample data for the last 30 days
-    today = datetime.now().date()
-    for i in range(30):
-        stat_date = today - timedelta(days=i)
-        
-        # Check if we already have data for this date
-        existing = db.query(GitHubStats).filter(
-            GitHubStats.user_id == current_user.id,
-            GitHubStats.date == stat_date
-        ).first()
-        
-        if not existing:
-            # Create sample data
-            stat = GitHubStats(
-                user_id=current_user.id,
-                date=stat_date,
-                commits=random.randint(0, 10),
-                lines_added=random.randint(0, 500),
-                lines_removed=random.randint(0, 200),
-                pull_requests=random.randint(0, 3),
-                issues=random.randint(0, 2),
-                repositories=json.dumps(["project-1", "project-2"])
-            )
-            db.add(stat)
+    try:
+        job, created = await job_queue.submit(db, "github_sync", current_user.id)
+    except QueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
     
-    db.commit()
-    return {"message": "GitHub data synced successfully"}
\ No newline at end of file
+    return {"job_id": job.id, "status": job.status, "created": created}
+
+@router.get("/sync/{job_id}")
+async def get_sync_status(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    job = await job_queue.get(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "succeeded":
+        # The sync wrote outside any request; the stats read next must see it
+        note_write()
+    return job_to_dict(job)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+import io
+
+from database import get_db
+from auth_utils import get_current_user, Principal
+import importer
+
+router = APIRouter()
+
+@router.post("/import")
+async def import_data(
+    file: UploadFile = File(...),
+    format: Literal["ndjson", "csv"] = "ndjson",
+    resource: Optional[Literal["tasks", "sessions"]] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import historical tasks and sessions, e.g. a file from ``GET /api/export``.
+
+    CSV files hold one ``resource``. The upload is read a chunk at a time,
+    so large files are not held in memory. Returns counts, skipped rows
+    with their errors and the import throughput.
+    """
+    if format == "csv" and resource is None:
+        raise HTTPException(status_code=400, detail="CSV imports need a resource")
+
+    text_file = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        report = await importer.import_rows(db, current_user.id, importer.read_rows(text_file, format, resource))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        text_file.detach()
+    return report.as_dict()
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from database import get_db
-from models import AIInsight, User, PomodoroSession
-from auth_utils import get_current_user
+from database import get_db, upsert
+from models import AIInsight, InsightWatermark, ResourceVersion
+from auth_utils import get_current_user, get_read_db, Principal
+import versions
+import events
+from serialization import json_response, rows_to_dicts
 
 router = APIRouter()
 
+INSIGHT_COLUMNS = (
+    AIInsight.id, AIInsight.type, AIInsight.title, AIInsight.description,
+    AIInsight.confidence, AIInsight.actionable, AIInsight.created_at
+)
+
 class InsightResponse(BaseModel):
     id: int
     type: str
@@ -25,97 +33,88 @@ class InsightResponse(BaseModel):
 
 @router.get("/", response_model=List[InsightResponse])
 async def get_insights(
+    request: Request,
+    response: Response,
     limit: int = 10,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    insights = db.query(AIInsight).filter(
-        AIInsight.user_id == current_user.id
-    ).order_by(AIInsight.created_at.desc()).limit(limit).all()
-    return insights
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "insights")
+    if unchanged:
+        return unchanged
+    
+    return json_response(await fetch_insights(db, current_user.id, limit), response)
 
-@router.post("/generate")
-async def generate_insights(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    # Get recent pomodoro sessions for analysis
-    sessions = db.query(PomodoroSession).filter(
-        PomodoroSession.user_id == current_user.id
-    ).order_by(PomodoroSession.started_at.desc()).limit(50).all()
+async def fetch_insights(db: AsyncSession, user_id: int, limit: int = 10):
+    return rows_to_dicts(await db.execute(select(*INSIGHT_COLUMNS).where(
+        AIInsight.user_id == user_id
+    ).order_by(AIInsight.created_at.desc()).limit(limit)))
+
+# Resources analytics.load_history reads; every write to them bumps its version
+WATERMARK_RESOURCES = ("pomodoro", "github")
+
+async def _current_watermark(db: AsyncSession, user_id: int):
+    current = dict((await db.execute(select(ResourceVersion.resource, ResourceVersion.version).where(
+        ResourceVersion.user_id == user_id,
+        ResourceVersion.resource.in_(WATERMARK_RESOURCES)
+    ))).all())
+    return {f"{resource}_version": current.get(resource, 0) for resource in WATERMARK_RESOURCES}
+
+async def refresh_insights(db: AsyncSession, user_id: int, force: bool = False):
+    """Rebuild a user's insights, one per type; the caller commits.
+
+    Returns the number of insights, or ``None`` when nothing changed since
+    the last run and ``force`` is not set.
+    """
+    current = await _current_watermark(db, user_id)
+    watermark = await db.get(InsightWatermark, user_id)
+    if not force and watermark and all(getattr(watermark, key) == value for key, value in current.items()):
+        return None
     
-    insights = []
+    # Analyse the user's full history, see analytics.py (imported here: NumPy is slow to load)
+    import analytics
+
+    history = await analytics.load_history(db, user_id)
+    insights = [
+        {"actionable": True, "user_id": user_id, "created_at": func.now(), **insight}
+        for insight in analytics.build_insights(history)
+    ]
     
-    if sessions:
-        # Analyze peak productivity hours
-        hour_counts = {}
-        for session in sessions:
-            if session.started_at:
-                hour = session.started_at.hour
-                hour_counts[hour] = hour_counts.get(hour, 0) + 1
-        
-        if hour_counts:
-            peak_hour = max(hour_counts.items(), key=lambda x: x[1])
-            percentage = round((peak_hour[1] / len(sessions)) * 100)
-            
-            insight = AIInsight(
-                type="peak_hours",
-                title="Peak Productivity Hours",
-                description=f"You're most productive around {peak_hour[0]}:00 with {percentage}% of your sessions.",
-                confidence=85,
-                actionable=True,
-                user_id=current_user.id
-            )
-            insights.append(insight)
-        
-        # Analyze recent focus trends
-        recent_sessions = [s for s in sessions[:10] if s.completed]
-        if len(recent_sessions) >= 5:
-            avg_duration = sum(s.duration for s in recent_sessions) / len(recent_sessions)
-            
-            if avg_duration > 20:
-                insight = AIInsight(
-                    type="focus_trend",
-                    title="Strong Focus Sessions",
-                    description=f"Your average session length is {avg_duration:.1f} minutes. Excellent focus!",
-                    confidence=90,
-                    actionable=True,
-                    user_id=current_user.id
-                )
-                insights.append(insight)
-            else:
-                insight = AIInsight(
-                    type="focus_trend",
-                    title="Consider Longer Sessions",
-                    description=f"Your average session is {avg_duration:.1f} minutes. Try extending to 25-minute sessions.",
-                    confidence=80,
-                    actionable=True,
-                    user_id=current_user.id
-                )
-                insights.append(insight)
-        
-        # Break pattern analysis
-        work_sessions = [s for s in sessions if s.session_type == "work" and s.completed]
-        if len(work_sessions) >= 3:
-            # Check if user has been working consecutively
-            recent_work = work_sessions[:3]
-            time_diff = (recent_work[0].started_at - recent_work[2].started_at).total_seconds() / 3600
-            
-            if time_diff < 3:  # 3 consecutive work sessions within 3 hours
-                insight = AIInsight(
-                    type="break_reminder",
-                    title="Take a Break",
-                    description="You've had several focused sessions recently. Consider taking a longer break.",
-                    confidence=85,
-                    actionable=True,
-                    user_id=current_user.id
-                )
-                insights.append(insight)
+    # Replace each insight type in place and drop types that no longer apply
+    await upsert(
+        db, AIInsight, insights,
+        index_elements=["user_id", "type"],
+        update_columns=["title", "description", "confidence", "actionable", "created_at"]
+    )
+    await db.execute(delete(AIInsight).where(
+        AIInsight.user_id == user_id,
+        AIInsight.type.not_in([insight["type"] for insight in insights])
+    ))
     
-    # Save insights to database
-    for insight in insights:
-        db.add(insight)
+    if watermark is None:
+        watermark = InsightWatermark(user_id=user_id)
+        db.add(watermark)
+    for key, value in current.items():
+        setattr(watermark, key, value)
+    await versions.bump(db, user_id, "insights")
+    return len(insights)
+
+@router.post("/generate")
+async def generate_insights(
+    force: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Refresh the user's insights, one per type.
+
+    Skipped when no session or GitHub stat has changed since the last run,
+    unless ``force`` is set.
+    """
+    count = await refresh_insights(db, current_user.id, force)
+    if count is None:
+        return {"message": "Insights are up to date", "count": 0, "skipped": True}
     
-    db.commit()
+    await db.commit()
     
-    return {"message": f"Generated {len(insights)} new insights", "count": len(insights)}
\ No newline at end of file
+    await events.publish(current_user.id, "insights.updated", count=count)
+    return {"message": f"Generated {count} insights", "count": count, "skipped": False}
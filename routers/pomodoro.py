@@ -1,19 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timezone
+import logging
+import uuid
 
-from database import get_db
-from models import PomodoroSession, User
-from auth_utils import get_current_user
+from database import get_db, insert_ignore, note_write
+from models import PomodoroSession, Task
+from auth_utils import get_current_user, get_read_db, Principal
+from write_behind import session_writes, BufferFull
+import rollups
+import versions
+import events
+from serialization import json_response, rows_to_dicts
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SESSION_COLUMNS = (
+    PomodoroSession.id, PomodoroSession.duration, PomodoroSession.completed, PomodoroSession.session_type,
+    PomodoroSession.task_id, PomodoroSession.started_at, PomodoroSession.completed_at
+)
+
 class PomodoroCreate(BaseModel):
     duration: int  # in minutes
     session_type: str = "work"
     task_id: Optional[int] = None
+    completed: bool = False
+    # Retrying with the same value never creates a second session
+    client_ref: Optional[str] = Field(None, min_length=1, max_length=64)
 
 class PomodoroUpdate(BaseModel):
     completed: Optional[bool] = None
@@ -33,51 +53,186 @@ class PomodoroResponse(BaseModel):
 
 @router.get("/sessions", response_model=List[PomodoroResponse])
 async def get_sessions(
+    request: Request,
+    response: Response,
     limit: int = 50,
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user), 
+    db: AsyncSession = Depends(get_read_db)
 ):
-    sessions = db.query(PomodoroSession).filter(
-        PomodoroSession.user_id == current_user.id
-    ).order_by(PomodoroSession.started_at.desc()).limit(limit).all()
-    return sessions
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "pomodoro")
+    if unchanged:
+        return unchanged
+    
+    return json_response(await fetch_sessions(db, current_user.id, limit), response)
+
+async def fetch_sessions(db: AsyncSession, user_id: int, limit: int = 50):
+    return rows_to_dicts(await db.execute(select(*SESSION_COLUMNS).where(
+        PomodoroSession.user_id == user_id
+    ).order_by(PomodoroSession.started_at.desc()).limit(limit)))
 
-@router.post("/sessions", response_model=PomodoroResponse)
+QUEUED_RESPONSE = {202: {"description": "Queued for a later batched commit (SESSION_WRITE_BEHIND)"}}
+
+async def queue_change(change: dict, **acknowledgment):
+    try:
+        await session_writes.submit(change)
+    except BufferFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    # Committed by the flusher, outside this request
+    note_write()
+    return JSONResponse(status_code=202, content={"status": "queued", **acknowledgment})
+
+@router.post("/sessions", response_model=PomodoroResponse, responses=QUEUED_RESPONSE)
 async def create_session(
     session: PomodoroCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    if session_writes.enabled:
+        client_ref = session.client_ref or uuid.uuid4().hex
+        return await queue_change({
+            "op": "create",
+            "user_id": current_user.id,
+            "client_ref": client_ref,
+            "duration": session.duration,
+            "session_type": session.session_type,
+            "task_id": session.task_id,
+            "completed": session.completed,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }, client_ref=client_ref)
+
+    if session.client_ref:
+        existing = await db.scalar(select(PomodoroSession).where(
+            PomodoroSession.user_id == current_user.id,
+            PomodoroSession.client_ref == session.client_ref
+        ))
+        if existing:
+            return existing
+
     db_session = PomodoroSession(
         duration=session.duration,
         session_type=session.session_type,
         task_id=session.task_id,
-        user_id=current_user.id
+        completed=session.completed,
+        client_ref=session.client_ref,
+        user_id=current_user.id,
+        # Set here rather than by the server default, so the rollup counts
+        # the session on the same day update_session will read back
+        started_at=datetime.now(timezone.utc)
     )
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    stats_changed = await rollups.apply_change(db, current_user.id, None, rollups.session_contribution(db_session))
+    await versions.bump(db, current_user.id, "pomodoro")
+    await db.commit()
+    await db.refresh(db_session)
+    
+    await events.publish(current_user.id, "session.created", session=PomodoroResponse.model_validate(db_session).model_dump(mode="json"))
+    if stats_changed:
+        await events.publish_stats(db, current_user.id)
     return db_session
 
-@router.put("/sessions/{session_id}", response_model=PomodoroResponse)
+@router.put("/sessions/{session_id}", response_model=PomodoroResponse, responses=QUEUED_RESPONSE)
 async def update_session(
     session_id: int,
     session_update: PomodoroUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    db_session = db.query(PomodoroSession).filter(
+    db_session = await db.scalar(select(PomodoroSession).where(
         PomodoroSession.id == session_id,
         PomodoroSession.user_id == current_user.id
-    ).first()
+    ).with_for_update())
     
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    if session_writes.enabled:
+        return await queue_change({
+            "op": "update",
+            "user_id": current_user.id,
+            "session_id": session_id,
+            "fields": session_update.model_dump(mode="json", exclude_unset=True),
+        }, id=session_id)
+    
+    before = rollups.session_contribution(db_session)
     update_data = session_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_session, field, value)
+    stats_changed = await rollups.apply_change(db, current_user.id, before, rollups.session_contribution(db_session))
+    await versions.bump(db, current_user.id, "pomodoro")
+    
+    await db.commit()
+    await db.refresh(db_session)
     
-    db.commit()
-    db.refresh(db_session)
-    return db_session
\ No newline at end of file
+    await events.publish(current_user.id, "session.updated", session=PomodoroResponse.model_validate(db_session).model_dump(mode="json"))
+    if stats_changed:
+        await events.publish_stats(db, current_user.id)
+    return db_session
+
+async def apply_session_changes(db: AsyncSession, changes: list):
+    """Commit a batch of queued session creates and updates.
+
+    Safe to replay: a create whose ``client_ref`` the user already has is
+    skipped, and an update sets the same values again. Rollups and versions
+    are updated once per user, and events go out after the commit.
+    """
+    creates = {}
+    for change in changes:
+        if change["op"] == "create":
+            creates.setdefault((change["user_id"], change["client_ref"]), change)
+    # Sessions may only point at their owner's tasks
+    task_ids = {change["task_id"] for change in creates.values() if change["task_id"] is not None}
+    task_owners = dict((await db.execute(
+        select(Task.id, Task.user_id).where(Task.id.in_(task_ids))
+    )).all()) if task_ids else {}
+
+    created = await insert_ignore(db, PomodoroSession, [{
+        "user_id": change["user_id"],
+        "client_ref": change["client_ref"],
+        "duration": change["duration"],
+        "session_type": change["session_type"],
+        "task_id": change["task_id"] if task_owners.get(change["task_id"]) == change["user_id"] else None,
+        "completed": change["completed"],
+        "started_at": datetime.fromisoformat(change["started_at"]),
+    } for change in creates.values()], index_elements=["user_id", "client_ref"], returning=PomodoroSession)
+    contributions = defaultdict(list)
+    for db_session in created:
+        contributions[db_session.user_id].append((None, rollups.session_contribution(db_session)))
+
+    updates = [change for change in changes if change["op"] == "update"]
+    sessions = {db_session.id: db_session for db_session in (await db.scalars(select(PomodoroSession).where(
+        PomodoroSession.id.in_({change["session_id"] for change in updates})
+    ).with_for_update())).all()} if updates else {}
+    updated = {}
+    for change in updates:
+        db_session = sessions.get(change["session_id"])
+        if db_session is None or db_session.user_id != change["user_id"]:
+            logger.warning("Dropping a queued update of missing session %s", change["session_id"])
+            continue
+        before = rollups.session_contribution(db_session)
+        for field, value in PomodoroUpdate(**change["fields"]).dict(exclude_unset=True).items():
+            setattr(db_session, field, value)
+        contributions[db_session.user_id].append((before, rollups.session_contribution(db_session)))
+        updated[db_session.id] = db_session
+
+    stats_changed = set()
+    for user_id, pairs in contributions.items():
+        if await rollups.apply_changes(db, user_id, pairs):
+            stats_changed.add(user_id)
+        await versions.bump(db, user_id, "pomodoro")
+    await db.commit()
+
+    for db_session in created:
+        await events.publish(
+            db_session.user_id, "session.created",
+            session=PomodoroResponse.model_validate(db_session).model_dump(mode="json"),
+            client_ref=db_session.client_ref
+        )
+    for db_session in updated.values():
+        await events.publish(
+            db_session.user_id, "session.updated",
+            session=PomodoroResponse.model_validate(db_session).model_dump(mode="json")
+        )
+    for user_id in stats_changed:
+        await events.publish_stats(db, user_id)
+
+session_writes.register(apply_session_changes)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import time
+
+from database import SessionLocal
+from auth_utils import authenticate, decode_token
+import events
+
+router = APIRouter()
+
+def format_event(event: dict):
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/stream")
+async def stream_events(request: Request, token: str):
+    """Server-sent change events for the user's tasks, sessions, stats and insights.
+
+    ``EventSource`` cannot send an Authorization header, so the access token
+    is passed as ``token``. The stream ends when the token expires.
+    """
+    # A short-lived session: the stream itself must not hold a connection
+    async with SessionLocal() as db:
+        principal = await authenticate(token, db)
+    expires_at = decode_token(token).get("exp")
+
+    async def event_source():
+        async with events.broker.subscribe(principal.id) as queue:
+            yield "retry: 5000\n" + format_event({"type": "ready", "complete": events.broker.complete})
+            while expires_at is None or time.time() < expires_at:
+                try:
+                    event = await asyncio.wait_for(queue.get(), events.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
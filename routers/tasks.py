@@ -1,16 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
+import base64
 import json
 
 from database import get_db
-from models import Task, User
-from auth_utils import get_current_user
+from models import PomodoroSession, Task, TaskTag
+from auth_utils import get_current_user, get_read_db, Principal
+import rollups
+import search
+import versions
+import events
+from serialization import json_response, rows_to_dicts
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Operations accepted by POST /api/tasks/bulk in one request
+MAX_BULK_OPERATIONS = 500
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_QUERY_LENGTH = 200
+# Ranked results are paged by offset; deeper pages get slower
+MAX_SEARCH_OFFSET = 1000
+
+# TaskResponse fields, read as plain rows on the list path
+TASK_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.priority, Task.completed,
+    Task.deadline, Task.time_spent, Task.created_at, Task.updated_at
+)
+
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -42,98 +64,374 @@ class TaskResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SearchHighlights(BaseModel):
+    title: str  # HTML-escaped, matches wrapped in <mark>
+    description: Optional[str]  # snippet around the matches, if any
+
+class TaskSearchResult(TaskResponse):
+    rank: float
+    highlights: SearchHighlights
+
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+class BulkOperation(BaseModel):
+    action: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # task to update or delete
+    task: Optional[TaskUpdate] = None  # fields to create the task with, or to change
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation] = Field(..., min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+class BulkResult(BaseModel):
+    index: int
+    action: str
+    status: int  # HTTP status the operation would have had on its own
+    id: Optional[int] = None
+    task: Optional[TaskResponse] = None
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[BulkResult]
+
+def encode_cursor(task: Task):
+    raw = json.dumps([task.created_at.isoformat(), task.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/", response_model=List[TaskResponse])
-async def get_tasks(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    tasks = db.query(Task).filter(Task.user_id == current_user.id).order_by(Task.created_at.desc()).all()
+async def get_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
+    tag: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Newest tasks first, one page at a time.
+
+    When more tasks match, the ``X-Next-Cursor`` response header carries the
+    cursor for the following page.
+    """
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "tasks")
+    if unchanged:
+        return unchanged
     
-    # Parse tags from JSON string
+    tasks, next_cursor = await fetch_tasks(
+        db, current_user.id, limit, cursor,
+        completed=completed,
+        priority=priority,
+        deadline_after=deadline_after,
+        deadline_before=deadline_before,
+        tag=tag
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return json_response(tasks, response)
+
+async def fetch_tasks(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
+    tag: Optional[str] = None
+):
+    """One page of a user's tasks as TaskResponse-shaped dicts; returns ``(tasks, next_cursor)``."""
+    query = select(*TASK_COLUMNS).where(Task.user_id == user_id)
+    
+    if completed is not None:
+        query = query.where(Task.completed == completed)
+    if priority:
+        query = query.where(Task.priority == priority)
+    if deadline_after:
+        query = query.where(Task.deadline >= deadline_after)
+    if deadline_before:
+        query = query.where(Task.deadline <= deadline_before)
+    if tag:
+        query = query.join(TaskTag, (TaskTag.task_id == Task.id) & (TaskTag.name == tag))
+    if cursor:
+        created_at, task_id = decode_cursor(cursor)
+        # Compare against the stored timestamp so the bound value's precision
+        # cannot skew the ordering; the cursor copy covers a deleted anchor.
+        anchor = select(Task.created_at).where(Task.id == task_id).scalar_subquery()
+        query = query.where(
+            tuple_(Task.created_at, Task.id) < tuple_(func.coalesce(anchor, created_at), task_id)
+        )
+    
+    # Served by the (user_id, created_at, id) indexes on Task
+    rows = (await db.execute(
+        query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1)
+    )).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    
+    tasks = rows_to_dicts(rows)
+    tags = await fetch_tags(db, [task["id"] for task in tasks])
     for task in tasks:
-        if task.tags:
-            try:
-                task.tags = json.loads(task.tags)
-            except:
-                task.tags = []
-        else:
-            task.tags = []
+        task["tags"] = tags.get(task["id"], [])
+    return tasks, next_cursor
+
+async def fetch_tags(db: AsyncSession, task_ids: list):
+    """Tag names per task id, in each task's tag order."""
+    tags = {}
+    if task_ids:
+        for task_id, name in await db.execute(select(TaskTag.task_id, TaskTag.name).where(
+            TaskTag.task_id.in_(task_ids)
+        ).order_by(TaskTag.task_id, TaskTag.position)):
+            tags.setdefault(task_id, []).append(name)
+    return tags
+
+@router.get("/tags", response_model=List[TagCount])
+async def get_tag_counts(
+    request: Request,
+    response: Response,
+    completed: Optional[bool] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "tasks")
+    if unchanged:
+        return unchanged
+    
+    query = select(TaskTag.name, func.count(TaskTag.task_id).label("count")).where(
+        TaskTag.user_id == current_user.id
+    )
+    if completed is not None:
+        query = query.join(Task, Task.id == TaskTag.task_id).where(Task.completed == completed)
     
-    return tasks
+    rows = await db.execute(query.group_by(TaskTag.name).order_by(func.count(TaskTag.task_id).desc(), TaskTag.name))
+    return [{"name": name, "count": count} for name, count in rows]
+
+@router.get("/search", response_model=List[TaskSearchResult])
+async def search_tasks(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Tasks whose title or description match ``q``, best match first.
+
+    Words must all match; "quoted phrases" match in order and -words are
+    excluded. When more results follow, the ``X-Next-Offset`` response
+    header carries the ``offset`` of the next page. A query matching more
+    than ``SEARCH_MAX_CANDIDATES`` tasks only ranks the newest that many
+    and answers with ``X-Search-Truncated: true``.
+    """
+    unchanged = await versions.not_modified(request, response, db, current_user.id, "tasks")
+    if unchanged:
+        return unchanged
+    
+    rows, truncated = await search.search_tasks(db, current_user.id, q, TASK_COLUMNS, limit + 1, offset)
+    if truncated:
+        response.headers["X-Search-Truncated"] = "true"
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    
+    results = []
+    for row in rows:
+        result = {column.key: getattr(row, column.key) for column in TASK_COLUMNS}
+        result["rank"] = row.rank
+        result["highlights"] = search.highlights(row)
+        results.append(result)
+    tags = await fetch_tags(db, [result["id"] for result in results])
+    for result in results:
+        result["tags"] = tags.get(result["id"], [])
+    return json_response(results, response)
 
 @router.post("/", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user), 
+    db: AsyncSession = Depends(get_db)
 ):
     db_task = Task(
         title=task.title,
         description=task.description,
         priority=task.priority,
         deadline=task.deadline,
-        tags=json.dumps(task.tags) if task.tags else None,
         user_id=current_user.id
     )
+    db_task.set_tags(task.tags)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    
-    # Parse tags for response
-    if db_task.tags:
-        try:
-            db_task.tags = json.loads(db_task.tags)
-        except:
-            db_task.tags = []
-    else:
-        db_task.tags = []
+    await versions.bump(db, current_user.id, "tasks")
+    await db.commit()
+    await db.refresh(db_task)
     
+    await events.publish(current_user.id, "task.created", task=TaskResponse.model_validate(db_task).model_dump(mode="json"))
     return db_task
 
+def apply_task_update(db_task: Task, update_data: dict):
+    if "completed" in update_data and update_data["completed"] != db_task.completed:
+        update_data["completed_at"] = datetime.now(timezone.utc) if update_data["completed"] else None
+    
+    if "tags" in update_data:
+        db_task.set_tags(update_data.pop("tags"))
+    
+    for field, value in update_data.items():
+        setattr(db_task, field, value)
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_tasks(
+    payload: BulkRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create, update and delete up to ``MAX_BULK_OPERATIONS`` tasks in one transaction.
+
+    Operations apply in order. One that cannot be applied (unknown task,
+    missing title) is reported in its result and skipped; the rest commit
+    together, flushed as batched INSERT, UPDATE and DELETE statements.
+    """
+    operations = payload.operations
+    ids = {op.id for op in operations if op.action != "create" and op.id is not None}
+    existing = {}
+    if ids:
+        existing = {task.id: task for task in (await db.scalars(select(Task).where(
+            Task.user_id == current_user.id,
+            Task.id.in_(ids)
+        ).with_for_update())).all()}
+    
+    results, changes, written, deleted_ids = [], [], [], []
+    for index, op in enumerate(operations):
+        result = {"index": index, "action": op.action, "status": 200, "id": op.id}
+        results.append(result)
+        update_data = op.task.dict(exclude_unset=True) if op.task else {}
+        
+        if op.action == "create":
+            if not update_data.get("title"):
+                result.update(status=400, error="title is required")
+                continue
+            db_task = Task(user_id=current_user.id)
+            apply_task_update(db_task, update_data)
+            db.add(db_task)
+            changes.append((None, rollups.task_contribution(db_task)))
+            result["status"] = 201
+            written.append((result, db_task))
+            continue
+        
+        db_task = existing.get(op.id)
+        if op.id is None:
+            result.update(status=400, error="id is required")
+        elif db_task is None:
+            result.update(status=404, error="Task not found")
+        elif op.action == "update":
+            before = rollups.task_contribution(db_task)
+            apply_task_update(db_task, update_data)
+            changes.append((before, rollups.task_contribution(db_task)))
+            written.append((result, db_task))
+        else:
+            changes.append((rollups.task_contribution(db_task), None))
+            # Deleted below in one statement; drop any pending changes to it
+            db.expunge(db_task)
+            del existing[op.id]
+            deleted_ids.append(op.id)
+    
+    if deleted_ids:
+        await db.execute(update(PomodoroSession).where(
+            PomodoroSession.task_id.in_(deleted_ids)
+        ).values(task_id=None))
+        await db.execute(delete(TaskTag).where(TaskTag.task_id.in_(deleted_ids)))
+        await db.execute(delete(Task).where(Task.id.in_(deleted_ids)))
+        written = [(result, db_task) for result, db_task in written if db_task.id not in deleted_ids]
+    
+    stats_changed = await rollups.apply_changes(db, current_user.id, changes)
+    await versions.bump(db, current_user.id, "tasks")
+    await db.commit()
+    
+    # One query (plus the tags) picks up new ids and server-side timestamps
+    if written:
+        await db.scalars(select(Task).where(
+            Task.id.in_({db_task.id for _, db_task in written})
+        ).execution_options(populate_existing=True))
+    for result, db_task in written:
+        result.update(id=db_task.id, task=TaskResponse.model_validate(db_task))
+    
+    succeeded = [result for result in results if result["status"] < 400]
+    counts = {action: sum(1 for result in succeeded if result["action"] == action) for action in ("create", "update", "delete")}
+    await events.publish(current_user.id, "tasks.bulk", **counts)
+    if stats_changed:
+        await events.publish_stats(db, current_user.id)
+    
+    return {
+        "created": counts["create"],
+        "updated": counts["update"],
+        "deleted": counts["delete"],
+        "failed": len(results) - len(succeeded),
+        "results": results,
+    }
+
 @router.put("/{task_id}", response_model=TaskResponse)
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    db_task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+    # Locked, so a concurrent edit cannot change what this one takes out of the rollup
+    db_task = await db.scalar(select(Task).where(Task.id == task_id, Task.user_id == current_user.id).with_for_update())
     
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    update_data = task_update.dict(exclude_unset=True)
-    
-    # Handle tags conversion
-    if "tags" in update_data:
-        update_data["tags"] = json.dumps(update_data["tags"]) if update_data["tags"] else None
-    
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
-    
-    db.commit()
-    db.refresh(db_task)
+    before = rollups.task_contribution(db_task)
+    apply_task_update(db_task, task_update.dict(exclude_unset=True))
+    stats_changed = await rollups.apply_change(db, current_user.id, before, rollups.task_contribution(db_task))
+    await versions.bump(db, current_user.id, "tasks")
     
-    # Parse tags for response
-    if db_task.tags:
-        try:
-            db_task.tags = json.loads(db_task.tags)
-        except:
-            db_task.tags = []
-    else:
-        db_task.tags = []
+    await db.commit()
+    await db.refresh(db_task)
     
+    await events.publish(current_user.id, "task.updated", task=TaskResponse.model_validate(db_task).model_dump(mode="json"))
+    if stats_changed:
+        await events.publish_stats(db, current_user.id)
     return db_task
 
 @router.delete("/{task_id}")
 async def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    db_task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+    db_task = await db.scalar(select(Task).where(Task.id == task_id, Task.user_id == current_user.id).with_for_update())
     
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    db.delete(db_task)
-    db.commit()
+    stats_changed = await rollups.apply_change(db, current_user.id, rollups.task_contribution(db_task), None)
+    await db.delete(db_task)
+    await versions.bump(db, current_user.id, "tasks")
+    await db.commit()
     
+    await events.publish(current_user.id, "task.deleted", id=task_id)
+    if stats_changed:
+        await events.publish_stats(db, current_user.id)
     return {"message": "Task deleted successfully"}
\ No newline at end of file
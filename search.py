@@ -0,0 +1,123 @@
+"""Full-text search over task titles and descriptions.
+
+PostgreSQL matches the GIN-indexed ``tasks.search_vector`` column (generated
+from the weighted title and description); SQLite uses the ``tasks_search``
+FTS5 table. Both are created by alembic/versions/0004_task_search.py and
+kept in sync with ``tasks`` by the database itself (a generated column, or
+triggers on SQLite), so every write path is covered. Queries take plain
+words (all must match), "quoted phrases" and -excluded words.
+"""
+from sqlalchemy import func, literal_column, select, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+import html
+import os
+import re
+
+from models import Task
+
+# Ranking costs time per matching task; a query matching more of a user's
+# tasks than this ranks only the newest that many matches
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 2000))
+
+SEARCH_CONFIG = literal_column("'english'")
+
+# Highlight delimiters, replaced by <mark> tags once the text is escaped
+START, STOP = "\x02", "\x03"
+DESCRIPTION_SNIPPET_WORDS = 24
+
+# -"quoted phrase", "quoted phrase", -word, word
+TERM_PATTERN = re.compile(r'(-?)"([^"]*)"?|(-?)(\S+)')
+
+tasks_search = table("tasks_search", column("rowid"))
+
+def parse_query(q: str):
+    """``(included, excluded)`` lists of phrases, each a list of words."""
+    included, excluded = [], []
+    for match in TERM_PATTERN.finditer(q):
+        negated = match.group(1) or match.group(3)
+        words = re.findall(r"\w+", match.group(2) if match.group(2) is not None else match.group(4))
+        if words:
+            (excluded if negated else included).append(words)
+    return included, excluded
+
+def fts5_query(user_id: int, q: str):
+    """The FTS5 MATCH expression for ``q`` within one user's tasks, or None when nothing is searched for."""
+    included, excluded = parse_query(q)
+    if not included:
+        return None
+    # Words are quoted, so FTS5 operators in the input are just text
+    def phrase(words):
+        return '"' + " ".join(words) + '"'
+
+    expression = " AND ".join(phrase(words) for words in included)
+    for words in excluded:
+        expression += f" NOT {phrase(words)}"
+    return f'user_id: "{user_id}" AND {{title description}}: ({expression})'
+
+def mark(text):
+    """HTML-escape a highlighted value and wrap its matches in <mark> tags."""
+    if text is None:
+        return None
+    return html.escape(text).replace(START, "<mark>").replace(STOP, "</mark>")
+
+def highlights(row):
+    """The ``highlights`` of a search result; a description without a match has none."""
+    description = row.description_highlight
+    return {
+        "title": mark(row.title_highlight),
+        "description": mark(description) if description and START in description else None,
+    }
+
+async def search_tasks(db: AsyncSession, user_id: int, q: str, columns, limit: int, offset: int = 0):
+    """Matching tasks as rows of ``columns`` plus ``rank``, ``title_highlight``
+    and ``description_highlight``, best match first.
+
+    Returns ``(rows, truncated)``; ``truncated`` is set when the query
+    matched more than ``SEARCH_MAX_CANDIDATES`` tasks, so older matches
+    were left out of the ranking.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        vector = literal_column("tasks.search_vector")
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(vector, query)
+        matches = (Task.user_id == user_id, vector.op("@@")(query))
+        match_id = Task.id
+        newest = select(Task.id).where(*matches).order_by(Task.id.desc())
+        statement = select(
+            *columns,
+            rank.label("rank"),
+            func.ts_headline(SEARCH_CONFIG, Task.title, query, f"StartSel={START}, StopSel={STOP}, HighlightAll=true").label("title_highlight"),
+            func.ts_headline(
+                SEARCH_CONFIG, Task.description, query,
+                f"StartSel={START}, StopSel={STOP}, MaxWords={DESCRIPTION_SNIPPET_WORDS}, MinWords=8, "
+                "MaxFragments=2, FragmentDelimiter=\" … \""
+            ).label("description_highlight"),
+        ).where(*matches).order_by(rank.desc(), Task.id.desc())
+    else:
+        match = fts5_query(user_id, q)
+        if match is None:
+            return [], False
+        fts = literal_column("tasks_search")
+        # The user's own tasks are already narrowed down by the MATCH
+        matches = (fts.op("MATCH")(match),)
+        match_id = tasks_search.c.rowid
+        newest = select(tasks_search.c.rowid).where(*matches).order_by(tasks_search.c.rowid.desc())
+        # Lower is better; title matches weigh ten times a description match
+        bm25 = func.bm25(fts, 10.0, 1.0, 0.0)
+        statement = select(
+            *columns,
+            (-bm25).label("rank"),
+            func.highlight(fts, 0, START, STOP).label("title_highlight"),
+            func.snippet(fts, 1, START, STOP, "…", DESCRIPTION_SNIPPET_WORDS).label("description_highlight"),
+        ).select_from(tasks_search).join(Task, Task.id == tasks_search.c.rowid).where(
+            *matches,
+            Task.user_id == user_id
+        ).order_by(bm25, Task.id.desc())
+
+    # Ids only grow, so the newest candidates are those from this id on;
+    # one more row tells whether any older match was left out
+    boundary = (await db.scalars(newest.limit(2).offset(SEARCH_MAX_CANDIDATES - 1))).all()
+    truncated = len(boundary) == 2
+    if truncated:
+        statement = statement.where(match_id >= boundary[0])
+    return (await db.execute(statement.limit(limit).offset(offset))).all(), truncated
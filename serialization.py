@@ -0,0 +1,44 @@
+from fastapi.responses import Response
+import orjson
+
+# Datetimes match Pydantic's JSON output: naive values as-is, UTC as "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def dumps(content):
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+def loads_list(raw):
+    """Decode a JSON array stored as text, tolerating empty or bad values."""
+    if not raw:
+        return []
+    try:
+        value = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return []
+    return value if isinstance(value, list) else []
+
+class FastJSONResponse(Response):
+    """JSON response for rows already shaped like the response model.
+
+    Returning it skips FastAPI's response-model validation, so list endpoints
+    select exactly the model's columns and hand over plain dicts.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+def json_response(content, response: Response = None):
+    """Render ``content``, keeping headers the endpoint set on its injected ``response``.
+
+    FastAPI drops those headers (ETag, cursors) when a Response is returned.
+    """
+    rendered = FastJSONResponse(content)
+    if response is not None:
+        for key, value in response.headers.items():
+            if key != "content-length":
+                rendered.headers[key] = value
+    return rendered
+
+def rows_to_dicts(rows):
+    return [row._asdict() for row in rows]
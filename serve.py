@@ -0,0 +1,70 @@
+"""Production entry point: migrate once, then start the uvicorn workers.
+
+    python serve.py --workers 4
+
+Migrations run here, before any worker starts, so workers skip schema work
+on startup (``DB_AUTO_MIGRATE=false``). When ``DB_MAX_CONNECTIONS`` is set,
+each worker's pool is sized so all workers together stay within it.
+"""
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def worker_pool_size(workers: int, max_connections: int, pool_size: int, max_overflow: int):
+    """``(pool_size, max_overflow)`` per worker within ``max_connections`` in total."""
+    per_worker = max_connections // workers
+    if per_worker < 1:
+        raise SystemExit(f"DB_MAX_CONNECTIONS={max_connections} leaves no connection for each of {workers} workers")
+    size = min(pool_size, per_worker)
+    return size, min(max_overflow, per_worker - size)
+
+async def migrate():
+    from database import engine
+    import migrations
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # One by default: the event stream broker is per process, so streams
+    # behind several workers miss changes handled by the others
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--skip-migrations", action="store_true", help="the schema is migrated separately")
+    args = parser.parse_args()
+
+    if not args.skip_migrations:
+        asyncio.run(migrate())
+
+    # Workers are fresh processes and read their settings from the environment
+    os.environ["DB_AUTO_MIGRATE"] = "false"
+    os.environ["WEB_WORKERS"] = str(args.workers)
+    max_connections = os.getenv("DB_MAX_CONNECTIONS")
+    if max_connections:
+        size, overflow = worker_pool_size(
+            args.workers, int(max_connections),
+            int(os.getenv("DB_POOL_SIZE", 5)), int(os.getenv("DB_MAX_OVERFLOW", 10))
+        )
+        os.environ["DB_POOL_SIZE"] = str(size)
+        os.environ["DB_MAX_OVERFLOW"] = str(overflow)
+        print(f"{args.workers} workers, {size} + {overflow} overflow connections each")
+
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=True,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ class DevDashApp {
         this.apiBase = window.location.origin.replace(':5000', ':8000');
         this.token = localStorage.getItem('auth_token');
         this.user = null;
+        this.responseCache = new Map();
+        this.stream = null;
+        this.streamConnected = false;
+        this.tasks = [];
         this.timer = {
             
             timeLeft: 25 * 60,
@@ -61,7 +65,7 @@ class DevDashApp {
     }
 
     async apiRequest(method, endpoint, data = null) {
-        const url = `${this.apiBase}${endpoint}`;
+        let url = `${this.apiBase}${endpoint}`;
         const options = {
             method,
             headers: {
@@ -82,8 +86,17 @@ class DevDashApp {
             }
         }
 
+        // Revalidate GETs we already hold a copy of; unchanged data comes back as 304
+        const cached = method === 'GET' ? this.responseCache.get(url) : null;
+        if (cached) {
+            options.headers['If-None-Match'] = cached.etag;
+        }
+
         try {
             const response = await fetch(url, options);
+            if (response.status === 304 && cached) {
+                return cached.body;
+            }
             if (!response.ok) {
                 if (response.status === 401) {
                     this.logout();
@@ -91,7 +104,12 @@ class DevDashApp {
                 }
                 throw new Error(`HTTP ${response.status}`);
             }
-            return await response.json();
+            const body = await response.json();
+            const etag = response.headers.get('ETag');
+            if (method === 'GET' && etag) {
+                this.responseCache.set(url, { etag, body });
+            }
+            return body;
         } catch (error) {
             console.error('API Request failed:', error);
             throw error;
@@ -100,14 +118,74 @@ class DevDashApp {
 
     async verifyAuth() {
         try {
-            this.user = await this.apiRequest('GET', '/api/auth/me');
+            // One round trip for the profile and every dashboard section
+            const data = await this.apiRequest('GET', '/api/bootstrap');
+            this.user = data.user;
             this.showDashboard();
-            await this.loadDashboardData();
+            this.applyDashboardData(data);
+            this.connectStream();
         } catch (error) {
             this.logout();
         }
     }
 
+    // Change events pushed by the server; while connected to a stream that
+    // sees every change, mutations patch local state from these instead of
+    // refetching whole resources.
+    connectStream() {
+        if (this.stream || typeof EventSource === 'undefined') return;
+
+        this.stream = new EventSource(`${this.apiBase}/api/stream?token=${encodeURIComponent(this.token)}`);
+        this.stream.addEventListener('ready', (event) => {
+            // Behind several workers with a per-process broker, changes
+            // handled by another worker never arrive here
+            this.streamConnected = JSON.parse(event.data).complete !== false;
+        });
+        this.stream.onerror = () => {
+            this.streamConnected = false;
+            // EventSource retries by itself unless the server refused the stream
+            if (this.stream?.readyState === EventSource.CLOSED) {
+                this.stream = null;
+            }
+        };
+
+        const handlers = {
+            'task.created': ({ task }) => this.setTasks([task, ...this.tasks.filter(t => t.id !== task.id)]),
+            'task.updated': ({ task }) => this.setTasks(this.tasks.map(t => t.id === task.id ? task : t)),
+            'task.deleted': ({ id }) => this.setTasks(this.tasks.filter(t => t.id !== id)),
+            'tasks.bulk': () => this.loadTasks(),
+            'session.created': ({ session }) => {
+                this.pomodoroSessions = [session, ...(this.pomodoroSessions || []).filter(s => s.id !== session.id)];
+                this.initFocusChart();
+            },
+            'session.updated': ({ session }) => {
+                this.pomodoroSessions = (this.pomodoroSessions || []).map(s => s.id === session.id ? session : s);
+                this.initFocusChart();
+            },
+            'stats': ({ stats }) => this.renderDashboardStats(stats),
+            'github.synced': async () => {
+                this.githubStats = await this.apiRequest('GET', '/api/github/stats');
+                this.initGitHubChart();
+            },
+            'insights.updated': () => this.loadInsights(),
+            'resync': () => this.loadDashboardData(),
+        };
+
+        for (const [type, handler] of Object.entries(handlers)) {
+            this.stream.addEventListener(type, (event) => {
+                Promise.resolve(handler(JSON.parse(event.data))).catch(error => {
+                    console.error(`Failed to apply ${type} event:`, error);
+                });
+            });
+        }
+    }
+
+    disconnectStream() {
+        this.stream?.close();
+        this.stream = null;
+        this.streamConnected = false;
+    }
+
     async handleLogin(e) {
         e.preventDefault();
         const username = document.getElementById('login-username').value;
@@ -165,6 +243,8 @@ class DevDashApp {
     logout() {
         this.token = null;
         this.user = null;
+        this.responseCache.clear();
+        this.disconnectStream();
         localStorage.removeItem('auth_token');
         this.showLandingPage();
     }
@@ -207,41 +287,56 @@ class DevDashApp {
     }
 
     async loadDashboardData() {
-        await Promise.all([
-            this.loadDashboardStats(),
-            this.loadTasks(),
-            this.loadGitHubStats(),
-            this.loadPomodoroSessions(),
-            this.loadInsights()
-        ]);
-        
+        const data = await this.apiRequest('GET', '/api/bootstrap', {
+            fields: 'stats,tasks,sessions,github_stats,insights'
+        });
+        this.applyDashboardData(data);
+    }
+
+    applyDashboardData(data) {
+        this.renderDashboardStats(data.stats);
+        this.setTasks(data.tasks);
+        this.githubStats = data.github_stats;
+        this.pomodoroSessions = data.sessions;
+        this.renderInsights(data.insights.slice(0, 3));
         this.initCharts();
+
+        // Sync runs in the background; refresh the chart once it finishes
+        this.syncGitHub();
     }
 
     async loadDashboardStats() {
         try {
             const stats = await this.apiRequest('GET', '/api/dashboard-stats');
-            
-            document.getElementById('today-commits').textContent = stats.todayCommits;
-            document.getElementById('today-focus').textContent = `${stats.todayFocusTime}h`;
-            document.getElementById('week-commits').textContent = stats.weekCommits;
-            document.getElementById('week-focus').textContent = `${stats.weekFocusTime}h`;
-            document.getElementById('week-tasks').textContent = stats.weekTasks;
-            document.getElementById('week-streak').textContent = stats.streak;
+            this.renderDashboardStats(stats);
         } catch (error) {
             console.error('Failed to load dashboard stats:', error);
         }
     }
 
+    renderDashboardStats(stats) {
+        document.getElementById('today-commits').textContent = stats.todayCommits;
+        document.getElementById('today-focus').textContent = `${stats.todayFocusTime}h`;
+        document.getElementById('week-commits').textContent = stats.weekCommits;
+        document.getElementById('week-focus').textContent = `${stats.weekFocusTime}h`;
+        document.getElementById('week-tasks').textContent = stats.weekTasks;
+        document.getElementById('week-streak').textContent = stats.streak;
+    }
+
     async loadTasks() {
         try {
             const tasks = await this.apiRequest('GET', '/api/tasks/');
-            this.renderTasks(tasks.slice(0, 5)); // Show only first 5 tasks
+            this.setTasks(tasks);
         } catch (error) {
             console.error('Failed to load tasks:', error);
         }
     }
 
+    setTasks(tasks) {
+        this.tasks = tasks;
+        this.renderTasks(tasks.slice(0, 5)); // Show only first 5 tasks
+    }
+
     renderTasks(tasks) {
         const tasksList = document.getElementById('tasks-list');
         
@@ -280,8 +375,10 @@ class DevDashApp {
     async toggleTask(taskId, completed) {
         try {
             await this.apiRequest('PUT', `/api/tasks/${taskId}`, { completed });
-            await this.loadTasks();
-            await this.loadDashboardStats();
+            if (!this.streamConnected) {
+                await this.loadTasks();
+                await this.loadDashboardStats();
+            }
         } catch (error) {
             console.error('Failed to toggle task:', error);
         }
@@ -313,8 +410,9 @@ class DevDashApp {
             });
 
             this.hideTaskModal();
-            await this.loadTasks();
-            await this.loadDashboardStats();
+            if (!this.streamConnected) {
+                await this.loadTasks();
+            }
         } catch (error) {
             console.error('Failed to create task:', error);
             alert('Failed to create task. Please try again.');
@@ -390,7 +488,9 @@ class DevDashApp {
         document.getElementById('timer-session').textContent = 
             `${this.timer.sessionType === 'work' ? 'Work' : 'Break'} Session ${this.timer.session}`;
             
-        await this.loadDashboardStats();
+        if (!this.streamConnected) {
+            await this.loadDashboardStats();
+        }
     }
 
     updateTimerDisplay() {
@@ -408,26 +508,33 @@ class DevDashApp {
         document.getElementById('timer-progress').style.strokeDashoffset = offset;
     }
 
-    async loadGitHubStats() {
+    async syncGitHub() {
+        let job;
         try {
-            // First sync GitHub data to generate some sample data
-            await this.apiRequest('POST', '/api/github/sync');
-            
-            const stats = await this.apiRequest('GET', '/api/github/stats');
-            this.githubStats = stats;
+            job = await this.apiRequest('POST', '/api/github/sync');
         } catch (error) {
-            console.error('Failed to load GitHub stats:', error);
-            this.githubStats = [];
+            // Accounts without a linked GitHub login just show stored stats
+            console.warn('GitHub sync skipped:', error);
+            return;
         }
-    }
 
-    async loadPomodoroSessions() {
-        try {
-            const sessions = await this.apiRequest('GET', '/api/pomodoro/sessions');
-            this.pomodoroSessions = sessions;
-        } catch (error) {
-            console.error('Failed to load pomodoro sessions:', error);
-            this.pomodoroSessions = [];
+        // The stream announces the finished sync with a github.synced event
+        if (this.streamConnected) return;
+
+        for (let attempt = 0; attempt < 30 && ['queued', 'running'].includes(job.status); attempt++) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            try {
+                job = await this.apiRequest('GET', `/api/github/sync/${job.job_id || job.id}`);
+            } catch (error) {
+                console.error('Failed to check GitHub sync:', error);
+                return;
+            }
+        }
+
+        if (job.status === 'succeeded') {
+            this.githubStats = await this.apiRequest('GET', '/api/github/stats');
+            this.initGitHubChart();
+            await this.loadDashboardStats();
         }
     }
 
@@ -480,6 +587,8 @@ class DevDashApp {
             case 'peak_hours': return 'lightbulb';
             case 'focus_trend': return 'trending-up';
             case 'break_reminder': return 'alert-triangle';
+            case 'completion_rate': return 'check-circle';
+            case 'commit_focus': return 'git-commit';
             default: return 'brain';
         }
     }
@@ -489,6 +598,7 @@ class DevDashApp {
             case 'peak_hours': return 'text-blue-600 bg-blue-50 border-blue-400';
             case 'focus_trend': return 'text-green-600 bg-green-50 border-green-400';
             case 'break_reminder': return 'text-orange-600 bg-orange-50 border-orange-400';
+            case 'completion_rate': return 'text-teal-600 bg-teal-50 border-teal-400';
             default: return 'text-purple-600 bg-purple-50 border-purple-400';
         }
     }
@@ -500,7 +610,9 @@ class DevDashApp {
             button.disabled = true;
 
             await this.apiRequest('POST', '/api/insights/generate');
-            await this.loadInsights();
+            if (!this.streamConnected) {
+                await this.loadInsights();
+            }
         } catch (error) {
             console.error('Failed to generate insights:', error);
             alert('Failed to generate insights. Please try again.');
@@ -544,7 +656,11 @@ class DevDashApp {
             return stat?.commits || Math.floor(Math.random() * 15);
         });
 
-        new Chart(ctx, {
+        if (this.githubChart) {
+            this.githubChart.destroy();
+        }
+
+        this.githubChart = new Chart(ctx, {
             type: 'line',
             data: {
                 labels,
@@ -605,7 +721,11 @@ class DevDashApp {
             return Math.round((totalMinutes / 60) * 100) / 100;
         });
 
-        new Chart(ctx, {
+        if (this.focusChart) {
+            this.focusChart.destroy();
+        }
+
+        this.focusChart = new Chart(ctx, {
             type: 'bar',
             data: {
                 labels,
@@ -0,0 +1,58 @@
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import note_write, upsert
+from models import ResourceVersion
+
+# Per-user version counters behind the ETags on the list endpoints. Writers
+# bump a resource in the same transaction as the change, so a GET can answer
+# 304 Not Modified from one primary-key lookup instead of re-running its query.
+RESOURCES = ("tasks", "pomodoro", "github", "insights")
+
+async def bump(db: AsyncSession, user_id: int, *resources: str):
+    """Mark resources as changed; call before committing the write."""
+    note_write()
+    await upsert(
+        db, ResourceVersion,
+        [{"user_id": user_id, "resource": resource, "version": 1} for resource in resources],
+        index_elements=["user_id", "resource"],
+        update_columns=[],
+        update_values={"version": ResourceVersion.version + 1}
+    )
+
+async def current_version(db: AsyncSession, user_id: int, resource: str):
+    version = await db.scalar(select(ResourceVersion.version).where(
+        ResourceVersion.user_id == user_id,
+        ResourceVersion.resource == resource
+    ))
+    return version or 0
+
+def make_etag(user_id: int, resource: str, version: int, target: str = ""):
+    # Filters and paging change the body, so path and query are part of the tag
+    digest = hashlib.sha256(f"{user_id}:{resource}:{version}:{target}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _matches(if_none_match: str, etag: str):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+async def not_modified(request: Request, response: Response, db: AsyncSession, user_id: int, resource: str):
+    """Tag a GET response; returns a 304 response when the client's copy is current."""
+    version = await current_version(db, user_id, resource)
+    headers = {
+        "ETag": make_etag(user_id, resource, version, f"{request.url.path}?{request.url.query}"),
+        # Let clients keep the body but always revalidate it
+        "Cache-Control": "private, no-cache",
+    }
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,252 @@
+"""Opt-in write-behind buffer for Pomodoro session writes.
+
+With ``SESSION_WRITE_BEHIND`` on, session creates and updates are appended
+to a local spill file and acknowledged once it is fsynced, instead of each
+committing on its own. The buffer hands the queued changes to a registered
+handler in one transaction when ``WRITE_BEHIND_FLUSH_SIZE`` of them are
+waiting, and at least every ``WRITE_BEHIND_FLUSH_SECONDS``.
+
+Spill files live in ``WRITE_BEHIND_SPILL_DIR`` as append-only segments:
+each process appends to its own, holds a lock on it, and deletes it once
+its changes are committed. Segments left by a process that died are
+replayed on startup by whichever process can lock them, so the handler
+must be idempotent (sessions use a per-user unique ``client_ref`` for that).
+"""
+import asyncio
+import logging
+import os
+import time
+
+import orjson
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+SESSION_WRITE_BEHIND = os.getenv("SESSION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", 200))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", 1))
+# Changes accepted but not yet committed; beyond this writers are turned away
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", 10000))
+WRITE_BEHIND_SPILL_DIR = os.getenv("WRITE_BEHIND_SPILL_DIR", "write-behind")
+
+class BufferFull(Exception):
+    pass
+
+class Segment:
+    """One spill file and the changes written to it."""
+
+    def __init__(self, path: str, file, changes=None):
+        self.path = path
+        self.file = file  # kept open (and locked) until the segment is deleted
+        self.changes = changes or []
+
+class WriteBehindBuffer:
+    """Durable in-process queue of changes, written in batches.
+
+    ``submit`` returns once a change is on disk; a background task passes
+    batches to the handler, oldest first, and retries a batch that failed
+    on the next tick. Writers that submit while an fsync is pending share
+    the next one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        spill_dir: str = WRITE_BEHIND_SPILL_DIR,
+        flush_size: int = WRITE_BEHIND_FLUSH_SIZE,
+        flush_seconds: float = WRITE_BEHIND_FLUSH_SECONDS,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+    ):
+        self.name = name
+        self.spill_dir = spill_dir
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.enabled = False
+        self.flushed = 0
+        self.failed_flushes = 0
+        self._handler = None
+        self._active = None
+        self._closed = []  # segments waiting to be written, oldest first
+        self._waiters = None  # future for writes not yet fsynced
+        self._file_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._syncs = set()
+        self._task = None
+
+    def register(self, handler):
+        """``handler(db, changes)`` applies a batch of changes and commits."""
+        self._handler = handler
+
+    @property
+    def pending(self):
+        active = len(self._active.changes) if self._active else 0
+        return active + sum(len(segment.changes) for segment in self._closed)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    async def start(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._closed = self._recover()
+        self._active = self._new_segment()
+        await asyncio.to_thread(self._fsync_dir)
+        self.enabled = True
+        self._task = asyncio.create_task(self._loop(), name=f"write-behind-{self.name}")
+        if self._closed:
+            logger.info("Replaying %d %s changes left in %s", self.pending, self.name, self.spill_dir)
+            self._wakeup.set()
+
+    async def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._task.cancel()
+        await asyncio.gather(self._task, *self._syncs, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Could not write buffered %s changes; they are kept in %s", self.name, self.spill_dir)
+        for segment in self._closed:
+            segment.file.close()
+        if self._active.changes:
+            self._active.file.close()
+        else:
+            self._delete(self._active)
+
+    async def submit(self, change: dict):
+        """Queue a JSON-able change; returns once it is safely on disk."""
+        if self.pending >= self.max_pending:
+            raise BufferFull("Too many writes are waiting, try again later")
+        segment = self._active
+        segment.file.write(orjson.dumps(change) + b"\n")
+        segment.file.flush()
+        segment.changes.append(change)
+        if len(segment.changes) >= self.flush_size:
+            self._wakeup.set()
+
+        waiters = self._waiters
+        if waiters is None:
+            waiters = self._waiters = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._sync(waiters))
+            self._syncs.add(task)
+            task.add_done_callback(self._syncs.discard)
+        # Shielded so one cancelled request does not fail the others waiting
+        await asyncio.shield(waiters)
+
+    async def flush(self):
+        """Write everything submitted so far."""
+        async with self._flush_lock:
+            await self._rotate()
+            while self._closed:
+                segment = self._closed[0]
+                async with SessionLocal() as db:
+                    await self._handler(db, segment.changes)
+                self._closed.pop(0)
+                self.flushed += len(segment.changes)
+                self._delete(segment)
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception("Could not write buffered %s changes, will retry", self.name)
+
+    async def _sync(self, waiters):
+        async with self._file_lock:
+            # A rotation syncs the segment it closes, and everyone waiting on it
+            if self._waiters is not waiters:
+                return
+            self._waiters = None
+            try:
+                await asyncio.to_thread(os.fsync, self._active.file.fileno())
+            except OSError as exc:
+                waiters.set_exception(exc)
+            else:
+                waiters.set_result(None)
+
+    async def _rotate(self):
+        async with self._file_lock:
+            closing = self._active
+            if not closing.changes:
+                return
+            waiters, self._waiters = self._waiters, None
+            self._active = self._new_segment()
+            self._closed.append(closing)
+            try:
+                await asyncio.to_thread(self._sync_segment, closing)
+            except OSError as exc:
+                if waiters:
+                    waiters.set_exception(exc)
+                raise
+            if waiters:
+                waiters.set_result(None)
+
+    def _new_segment(self):
+        # Names sort in creation order; the lock is taken before the file is visible
+        path = os.path.join(self.spill_dir, f"{self.name}-{time.time_ns()}-{os.getpid()}.ndjson")
+        file = open(path + ".tmp", "ab")
+        _lock(file)
+        os.replace(path + ".tmp", path)
+        return Segment(path, file)
+
+    def _sync_segment(self, segment: Segment):
+        os.fsync(segment.file.fileno())
+        # The new segment's directory entry
+        self._fsync_dir()
+
+    def _fsync_dir(self):
+        fd = os.open(self.spill_dir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _delete(self, segment: Segment):
+        os.unlink(segment.path)
+        segment.file.close()
+
+    def _recover(self):
+        """Segments of processes that are gone, oldest first."""
+        segments = []
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not (name.startswith(f"{self.name}-") and name.endswith(".ndjson")):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            file = open(path, "rb")
+            try:
+                _lock(file)
+            except BlockingIOError:
+                # Another running process is still using it
+                file.close()
+                continue
+            changes = []
+            for line in file:
+                try:
+                    changes.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    # A write cut short by the crash, never acknowledged
+                    logger.warning("Skipping a torn line in %s", path)
+            segments.append(Segment(path, file, changes))
+        return segments
+
+def _lock(file):
+    import fcntl
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+session_writes = WriteBehindBuffer("sessions")